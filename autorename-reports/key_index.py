@@ -0,0 +1,82 @@
+import re
+
+# Sufijo decimal que deja Excel en los códigos guardados como número (123.0)
+DECIMAL_SUFFIX = re.compile(r'\.0+$')
+
+
+class KeyIndex:
+    """Índice de claves del Excel (simples o compuestas) hacia el número de documento.
+
+    Cada clave es una lista de columnas; en el nombre del archivo las partes de
+    una clave compuesta van unidas por el separador. Se pueden indexar varias
+    claves y varias hojas a la vez: cualquiera de ellas resuelve el archivo
+    (varias claves pueden llevar al mismo documento).
+    """
+
+    def __init__(self, keys, rename_column, separator='_', strip_zeros=False, casefold=False):
+        self.keys = [list(columns) for columns in keys]
+        self.rename_column = rename_column
+        self.separator = separator
+        self.strip_zeros = strip_zeros
+        self.casefold = casefold
+        self.entries = {}
+        self.conflicts = []
+        self._key_lengths = sorted({len(columns) for columns in self.keys})
+
+    def normalize(self, value):
+        value = DECIMAL_SUFFIX.sub('', str(value).strip())
+        if self.casefold:
+            value = value.casefold()
+        if self.strip_zeros:
+            value = value.lstrip('0') or ('0' if value else '')
+        return value
+
+    def add_sheet(self, sheet_name, df):
+        """Indexa las filas de una hoja; devuelve cuántas claves añadió (None si se omite)"""
+        missing = {self.rename_column, *(c for columns in self.keys for c in columns)} - set(df.columns)
+        if missing:
+            print(f'Hoja {sheet_name}: faltan las columnas {", ".join(sorted(missing))}, se omite')
+            return None
+
+        added = 0
+        targets = df[self.rename_column].tolist()
+        for columns in self.keys:
+            values = zip(*(df[column].tolist() for column in columns))
+            for row_number, (parts, target) in enumerate(zip(values, targets), 2):
+                if is_blank(target) or any(is_blank(part) for part in parts):
+                    continue
+                key = tuple(self.normalize(part) for part in parts)
+                target = str(target).strip()
+                existing = self.entries.get(key)
+                if existing is None:
+                    self.entries[key] = (target, sheet_name, row_number)
+                    added += 1
+                elif existing[0] != target:
+                    self.conflicts.append((key, existing, (target, sheet_name, row_number)))
+        return added
+
+    def lookup(self, code):
+        """Número de documento para el código del archivo, o None"""
+        key = self.find(code)
+        return None if key is None else self.entries[key][0]
+
+    def find(self, code):
+        """Clave del índice que corresponde al código del archivo, o None"""
+        for length in self._key_lengths:
+            if length == 1:
+                parts = (code,)
+            else:
+                parts = code.split(self.separator)
+                if len(parts) != length:
+                    continue
+            key = tuple(self.normalize(part) for part in parts)
+            if key in self.entries:
+                return key
+        return None
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def is_blank(value):
+    return value is None or value != value or str(value).strip() == ''
@@ -1,52 +1,367 @@
+import argparse
+import json
 import pathlib
 import os
-import pandas as pd
 import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from key_index import KeyIndex
+from rename_plan import build_plan, write_plan_reports
 
 COLUMN_NAMES = ['Nº documento', 'Doc.compensación']
 FILE_PATH = 'soportes.xlsx'
 DIR_SOPORTS = "soports"
 DIR_RENOMBRADOS = "renombrados"
+ARCHIVE_PATH = 'renombrados.zip'
+PLAN_DIR = 'plan_renombrado'
 
-def read_db():
-    df = pd.read_excel(FILE_PATH, dtype={COLUMN_NAMES[1]: str})
-    df[COLUMN_NAMES[1]] = df[COLUMN_NAMES[1]].apply(lambda x: str(x).split('.')[0])
-    return df
+# Archivos leídos por adelantado mientras se escribe el zip
+READ_AHEAD = 16
 
-def rename_and_move_file(file, nu_doc):
-    file = pathlib.Path(file)
-    new_file_name = f'soporte de pago {nu_doc}.pdf'
-    new_file = pathlib.Path(DIR_RENOMBRADOS) / new_file_name
-    new_file.parent.mkdir(parents=True, exist_ok=True)
-    file.rename(new_file)
+# Hilos que recorren en paralelo las subcarpetas de soportes
+SCAN_WORKERS = 8
+PDF_EXTENSION = '.pdf'
 
-def read_dir_soports():
-    start_time = time.time()
-    db = read_db()
-    renamed_count = 0
-    not_found_count = 0
+# Valores por defecto; los cambia un archivo de configuración JSON con las
+# mismas claves y, por encima, los argumentos de la línea de comandos
+DEFAULT_CONFIG = {
+    'excel': FILE_PATH,
+    'sheets': [],
+    'keys': [[COLUMN_NAMES[1]]],
+    'rename_column': COLUMN_NAMES[0],
+    'key_separator': '_',
+    'strip_zeros': False,
+    'casefold': False,
+    'soports': DIR_SOPORTS,
+    'renombrados': DIR_RENOMBRADOS,
+    'zip': None,
+    'plan_dir': PLAN_DIR,
+    'workers': SCAN_WORKERS,
+}
+
+TYPE_NAMES = {str: 'un texto', list: 'una lista', int: 'un número entero', bool: 'true o false', type(None): 'null'}
+
+# Tipos admitidos para cada clave del archivo de configuración
+CONFIG_TYPES = {
+    'excel': (str,),
+    'sheets': (list, str, type(None)),
+    'keys': (list,),
+    'rename_column': (str,),
+    'key_separator': (str,),
+    'strip_zeros': (bool,),
+    'casefold': (bool,),
+    'soports': (str,),
+    'renombrados': (str,),
+    'zip': (str, type(None)),
+    'plan_dir': (str,),
+    'workers': (int,),
+}
+
+def read_config_file(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            file_config = json.load(f)
+    except OSError as e:
+        raise ValueError(f'No se pudo leer la configuración {path}: {e}')
+    except json.JSONDecodeError as e:
+        raise ValueError(f'La configuración {path} no es un JSON válido: {e}')
+
+    if not isinstance(file_config, dict):
+        raise ValueError(f'La configuración {path} debe ser un objeto JSON con claves')
+
+    unknown = sorted(set(file_config) - set(DEFAULT_CONFIG))
+    if unknown:
+        raise ValueError(
+            f'Claves desconocidas en {path}: {", ".join(unknown)} '
+            f'(válidas: {", ".join(DEFAULT_CONFIG)})'
+        )
+    for name, value in file_config.items():
+        allowed = CONFIG_TYPES[name]
+        # bool es subclase de int: workers no debe aceptar true/false
+        if not isinstance(value, allowed) or (isinstance(value, bool) and bool not in allowed):
+            expected = ' o '.join(TYPE_NAMES[t] for t in allowed)
+            raise ValueError(f'En {path}, "{name}" debe ser {expected}')
+    if file_config.get('workers', 1) < 1:
+        raise ValueError(f'En {path}, "workers" debe ser un número entero mayor que 0')
+    for columns in file_config.get('keys', []):
+        if not isinstance(columns, (str, list)) or not columns:
+            raise ValueError(f'En {path}, cada clave de "keys" debe ser un texto o una lista de columnas')
+    return file_config
+
+def load_config(args):
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        config.update(read_config_file(args.config))
+    if args.workers is not None and args.workers < 1:
+        raise ValueError('--workers debe ser un número entero mayor que 0')
+
+    for name in DEFAULT_CONFIG:
+        value = getattr(args, name, None)
+        if value is not None:
+            config[name] = value
 
-    for file in os.listdir(DIR_SOPORTS):
-        file_path = os.path.join(DIR_SOPORTS, file)
-        code = file.replace('.pdf', '')
+    if args.all_sheets:
+        config['sheets'] = None
+    if isinstance(config['sheets'], str):
+        config['sheets'] = [config['sheets']]
+    config['keys'] = [
+        [column.strip() for column in columns.split(',')] if isinstance(columns, str) else list(columns)
+        for columns in config['keys']
+    ]
+    return config
 
-        db_code = db[COLUMN_NAMES[1]]
-        row = db.loc[db_code == code]
+def read_db(config):
+    import pandas as pd
 
-        if row.empty:
-            print(f'No se encontro el codigo {code}')
-            not_found_count += 1
+    sheets = config['sheets']
+    with pd.ExcelFile(config['excel']) as book:
+        if sheets is None:
+            sheets = book.sheet_names
+        elif not sheets:
+            sheets = book.sheet_names[:1]
+        data = {sheet: book.parse(sheet, dtype=str) for sheet in sheets}
+
+    index = KeyIndex(
+        config['keys'],
+        config['rename_column'],
+        separator=config['key_separator'],
+        strip_zeros=config['strip_zeros'],
+        casefold=config['casefold'],
+    )
+    for sheet_name, df in data.items():
+        added = index.add_sheet(sheet_name, df)
+        if added is not None:
+            print(f'Hoja {sheet_name}: {added} claves')
+
+    for key, (target, sheet, row), (other, other_sheet, other_row) in index.conflicts:
+        print(
+            f'La clave {config["key_separator"].join(key)} apunta a {target} ({sheet}, fila {row}) '
+            f'y a {other} ({other_sheet}, fila {other_row}); se usa {target}'
+        )
+    return index
+
+def move_files(renames, dest_dir=DIR_RENOMBRADOS):
+    dest_dir = pathlib.Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    count = 0
+    for rename in renames:
+        try:
+            os.rename(rename.source, dest_dir / rename.target)
+        except OSError as e:
+            print(f'No se pudo mover {rename.source}: {e}')
             continue
-        else:
-            rename_and_move_file(file_path, row[COLUMN_NAMES[0]].values[0])
-            renamed_count += 1
+        count += 1
+    return count
+
+def read_file(file):
+    with open(file, 'rb') as f:
+        return f.read()
+
+def write_archive(renames, archive_path):
+    """Copia los soportes renombrados a un zip sin tocar los originales.
+
+    Un grupo de hilos lee hasta READ_AHEAD archivos por adelantado mientras el
+    zip se escribe de forma secuencial; los PDF se guardan sin recomprimir. Un
+    soporte que no se puede leer se informa y se omite, como en move_files.
+    """
+    archive_path = pathlib.Path(archive_path)
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    pending = deque()
+    count = 0
+
+    with ThreadPoolExecutor(max_workers=READ_AHEAD) as pool, zipfile.ZipFile(
+        archive_path, 'w', zipfile.ZIP_STORED, allowZip64=True
+    ) as archive:
+        for rename in renames:
+            pending.append((rename, pool.submit(read_file, rename.source)))
+            if len(pending) >= READ_AHEAD:
+                count += write_entry(archive, *pending.popleft())
+
+        while pending:
+            count += write_entry(archive, *pending.popleft())
+
+    return count
+
+def write_entry(archive, rename, data):
+    """Añade un soporte ya leído al zip; devuelve 1 si se añadió y 0 si no"""
+    try:
+        archive.writestr(rename.target, data.result())
+    except OSError as e:
+        print(f'No se pudo añadir {rename.source} al zip: {e}')
+        return 0
+    return 1
+
+def scan_dir(path):
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(PDF_EXTENSION) and entry.is_file():
+                    files.append((entry.path, entry.name[:-len(PDF_EXTENSION)]))
+    except OSError as e:
+        print(f'No se pudo leer la carpeta {path}: {e}')
+    return files, subdirs
+
+def scan_soports(root, workers=SCAN_WORKERS):
+    """Recorre la carpeta y sus subcarpetas y entrega (ruta, código) de cada PDF.
+
+    Cada carpeta se lee en un hilo del grupo y sus archivos se entregan en
+    cuanto termina, sin esperar a recorrer todo el árbol.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(scan_dir, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                for subdir in subdirs:
+                    pending.add(pool.submit(scan_dir, subdir))
+                yield from files
+
+def existing_names(dest_dir):
+    try:
+        return set(os.listdir(dest_dir))
+    except FileNotFoundError:
+        return set()
+
+def confirm(question):
+    try:
+        answer = input(f'{question} [s/N] ')
+    except EOFError:
+        return False
+    return answer.strip().lower() in ('s', 'si', 'sí', 'y', 'yes')
+
+def read_dir_soports(config=DEFAULT_CONFIG, dry_run=False, assume_yes=False):
+    """Planifica todos los renombrados, guarda los informes y solo entonces los ejecuta.
+
+    La planificación es de solo lectura; con dry_run termina ahí. Si no, se pide
+    confirmación (salvo assume_yes) antes de mover los archivos o crear el zip.
+    """
+    start_time = time.time()
+    index = read_db(config)
+    files = sorted(scan_soports(config['soports'], config['workers']))
+    archive_path = config['zip']
+    taken_names = () if archive_path else existing_names(config['renombrados'])
+
+    plan = build_plan(files, index, taken_names)
+    report_dir = write_plan_reports(plan, config['plan_dir'])
+
+    print(f'Archivos a renombrar: {len(plan.renames)}')
+    print(f'Archivos no encontrados: {len(plan.missing)}')
+    print(f'Destinos duplicados: {len(plan.duplicates)}')
+    print(f'Filas del Excel sin soporte: {len(plan.unmatched_rows)}')
+    print(f'Informes del plan en: {report_dir}')
+    print(f'Tiempo de planificación: {time.time() - start_time:.2f} segundos')
+
+    if dry_run:
+        print('Simulación: no se modificó ningún archivo')
+        return
+    if not plan.renames:
+        return
+    destination = archive_path or config['renombrados']
+    if not assume_yes and not confirm(f'¿Renombrar {len(plan.renames)} archivos en {destination}?'):
+        print('Plan no ejecutado')
+        return
+
+    start_time = time.time()
+    if archive_path:
+        renamed_count = write_archive(plan.renames, archive_path)
+    else:
+        renamed_count = move_files(plan.renames, config['renombrados'])
 
     end_time = time.time()
     elapsed_time = end_time - start_time
 
     print(f'Archivos renombrados: {renamed_count}')
-    print(f'Archivos no encontrados: {not_found_count}')
+    if archive_path:
+        print(f'Archivo generado: {archive_path}')
     print(f'Tiempo de ejecución: {elapsed_time:.2f} segundos')
 
+def main():
+    parser = argparse.ArgumentParser(description='Renombra los soportes de pago según el Excel')
+    parser.add_argument('--config', default=None, help='Archivo JSON con la configuración')
+    parser.add_argument('--excel', default=None, help=f'Excel de referencia (por defecto: {FILE_PATH})')
+    parser.add_argument(
+        '--sheet',
+        dest='sheets',
+        action='append',
+        default=None,
+        metavar='HOJA',
+        help='Hoja del Excel a usar; se puede repetir (por defecto: la primera)',
+    )
+    parser.add_argument('--all-sheets', action='store_true', help='Usar todas las hojas del Excel')
+    parser.add_argument(
+        '--key',
+        dest='keys',
+        action='append',
+        default=None,
+        metavar='COLUMNAS',
+        help=(
+            'Columnas separadas por comas que forman la clave del nombre del archivo; '
+            f'se puede repetir (por defecto: {COLUMN_NAMES[1]})'
+        ),
+    )
+    parser.add_argument(
+        '--rename-column',
+        default=None,
+        help=f'Columna con el número de documento (por defecto: {COLUMN_NAMES[0]})',
+    )
+    parser.add_argument(
+        '--key-separator',
+        default=None,
+        help='Separador entre las partes de una clave compuesta en el nombre del archivo (por defecto: _)',
+    )
+    parser.add_argument(
+        '--strip-zeros',
+        action='store_const',
+        const=True,
+        default=None,
+        help='Ignorar los ceros a la izquierda de los códigos',
+    )
+    parser.add_argument(
+        '--casefold',
+        action='store_const',
+        const=True,
+        default=None,
+        help='Comparar los códigos sin distinguir mayúsculas',
+    )
+    parser.add_argument('--soports', default=None, help=f'Carpeta de soportes (por defecto: {DIR_SOPORTS})')
+    parser.add_argument(
+        '--renombrados',
+        default=None,
+        help=f'Carpeta de los soportes renombrados (por defecto: {DIR_RENOMBRADOS})',
+    )
+    parser.add_argument(
+        '--plan-dir',
+        default=None,
+        help=f'Carpeta de los informes CSV del plan (por defecto: {PLAN_DIR})',
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Solo calcular el plan y sus informes, sin modificar archivos',
+    )
+    parser.add_argument('-y', '--yes', action='store_true', help='Ejecutar el plan sin pedir confirmación')
+    parser.add_argument('--workers', type=int, default=None, help=f'Hilos para recorrer carpetas (por defecto: {SCAN_WORKERS})')
+    parser.add_argument(
+        '--zip',
+        nargs='?',
+        const=ARCHIVE_PATH,
+        default=None,
+        metavar='RUTA',
+        help=f'Crear un zip con los soportes renombrados sin mover los originales (por defecto: {ARCHIVE_PATH})',
+    )
+    args = parser.parse_args()
+    try:
+        config = load_config(args)
+    except ValueError as e:
+        parser.error(str(e))
+    read_dir_soports(config, dry_run=args.dry_run, assume_yes=args.yes)
+
 if __name__ == '__main__':
-    read_dir_soports()
\ No newline at end of file
+    main()
@@ -0,0 +1,107 @@
+import csv
+import pathlib
+from dataclasses import dataclass, field
+
+PLAN_FILE = 'plan.csv'
+MISSING_FILE = 'codigos_no_encontrados.csv'
+DUPLICATES_FILE = 'destinos_duplicados.csv'
+UNMATCHED_FILE = 'filas_sin_soporte.csv'
+
+
+@dataclass(slots=True)
+class PlannedRename:
+    source: str
+    code: str
+    nu_doc: str
+    target: str
+
+
+@dataclass(slots=True)
+class RenamePlan:
+    renames: list = field(default_factory=list)
+    missing: list = field(default_factory=list)
+    duplicates: list = field(default_factory=list)
+    unmatched_rows: list = field(default_factory=list)
+
+
+def new_file_name(nu_doc):
+    return f'soporte de pago {nu_doc}.pdf'
+
+
+def unique_entry_name(nu_doc, used_names):
+    name = new_file_name(nu_doc)
+    counter = 1
+    while name in used_names:
+        counter += 1
+        name = f'soporte de pago {nu_doc} ({counter}).pdf'
+    used_names.add(name)
+    return name
+
+
+def build_plan(files, index, taken_names=()):
+    """Calcula en memoria todos los renombrados sin tocar ningún archivo.
+
+    files son pares (ruta, código) ya ordenados; taken_names, los nombres que
+    ya existen en el destino. Los destinos repetidos reciben un sufijo (N) y se
+    anotan como duplicados, de modo que ningún soporte sobrescribe a otro.
+    """
+    plan = RenamePlan()
+    used_names = set(taken_names)
+    matched_rows = set()
+    by_name = {}
+
+    for source, code in files:
+        key = index.find(code)
+        if key is None:
+            plan.missing.append((source, code))
+            continue
+
+        nu_doc, sheet, row = index.entries[key]
+        matched_rows.add((sheet, row))
+        rename = PlannedRename(source, code, nu_doc, unique_entry_name(nu_doc, used_names))
+        plan.renames.append(rename)
+        by_name.setdefault(new_file_name(nu_doc), []).append(rename)
+
+    for name, renames in by_name.items():
+        if len(renames) > 1 or name in taken_names:
+            for rename in renames:
+                plan.duplicates.append((name, rename.source, rename.target))
+
+    seen_rows = set()
+    for key, (nu_doc, sheet, row) in index.entries.items():
+        if (sheet, row) in matched_rows or (sheet, row) in seen_rows:
+            continue
+        seen_rows.add((sheet, row))
+        plan.unmatched_rows.append((sheet, row, index.separator.join(key), nu_doc))
+
+    return plan
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_plan_reports(plan, report_dir):
+    report_dir = pathlib.Path(report_dir)
+    report_dir.mkdir(parents=True, exist_ok=True)
+
+    write_csv(
+        report_dir / PLAN_FILE,
+        ['origen', 'codigo', 'documento', 'destino'],
+        ((r.source, r.code, r.nu_doc, r.target) for r in plan.renames),
+    )
+    write_csv(report_dir / MISSING_FILE, ['archivo', 'codigo'], plan.missing)
+    write_csv(
+        report_dir / DUPLICATES_FILE,
+        ['destino', 'archivo', 'destino_asignado'],
+        plan.duplicates,
+    )
+    write_csv(
+        report_dir / UNMATCHED_FILE,
+        ['hoja', 'fila', 'clave', 'documento'],
+        plan.unmatched_rows,
+    )
+    return report_dir
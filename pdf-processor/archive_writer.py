@@ -0,0 +1,70 @@
+import io
+import json
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import List, Optional
+
+ARCHIVE_FORMATS = ("zip", "tar")
+
+MANIFEST_NAME = "manifiesto.json"
+
+
+class SupportArchive:
+    """Escribe los soportes como entradas de un único zip o tar.
+
+    Todas las entradas pasan por un solo manejador de archivo abierto en
+    escritura secuencial, en lugar de crear un archivo por soporte. Al cerrar
+    se añade un manifiesto con el valor de renombrado y el origen de cada
+    soporte; los duplicados omitidos apuntan al archivo de su original. Los PDF
+    se guardan sin recomprimir: ya vienen comprimidos.
+    """
+
+    def __init__(self, path: Path, archive_format: str = "zip"):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Formato de archivo no soportado: {archive_format}")
+        self.path = Path(path)
+        self.archive_format = archive_format
+        self.entries = 0
+        self._manifest: List[dict] = []
+        self._lock = threading.Lock()
+        if archive_format == "zip":
+            self._archive = zipfile.ZipFile(
+                self.path, "w", zipfile.ZIP_STORED, allowZip64=True
+            )
+        else:
+            self._archive = tarfile.open(self.path, "w")
+
+    def add(self, name: str, data: bytes, manifest_entry: Optional[dict] = None):
+        with self._lock:
+            self._add(name, data)
+            self.entries += 1
+            if manifest_entry is not None:
+                self._manifest.append(dict(manifest_entry, archivo=name))
+
+    def add_reference(self, name: str, manifest_entry: dict):
+        """Anota en el manifiesto un soporte que reutiliza la entrada name"""
+        with self._lock:
+            self._manifest.append(dict(manifest_entry, archivo=name))
+
+    def _add(self, name: str, data: bytes):
+        if self.archive_format == "zip":
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            self._archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        """Añade el manifiesto y cierra el archivo"""
+        with self._lock:
+            if self._archive is None:
+                return
+            manifest = json.dumps(self._manifest, ensure_ascii=False, indent=2)
+            self._add(MANIFEST_NAME, manifest.encode("utf-8"))
+            self._archive.close()
+            self._archive = None
@@ -0,0 +1,241 @@
+"""Benchmark del procesador de soportes con PDFs sintéticos de "REPORTE PAGOS".
+
+Genera un PDF de varias páginas (1 a 3 comprobantes por página) y un Excel de
+mapeo del tamaño pedido, ejecuta las etapas principales de PDFProcessor y
+escribe los resultados en JSON para poder comparar ejecuciones.
+
+    python benchmark.py --pages 300 --mapping-rows 20000 -o bench.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import fitz
+from openpyxl import Workbook
+
+from check_startup import probe_cli_startup
+from pdf_core import PDFProcessor
+
+SEARCH_COLUMN = "Transaction Reference Number"
+RENAME_COLUMN = "Rename"
+
+BANKS = ["Banco do Brasil", "Itaú Unibanco", "Bradesco", "Santander", "Caixa"]
+BENEFICIARIES = [
+    "Comercial Andina SAS",
+    "Logística del Sur Ltda",
+    "Servicios Integrales SA",
+    "Distribuidora Norte",
+    "Tecnología y Datos SAS",
+]
+
+
+def _random_reference(rng: random.Random) -> str:
+    return f"{rng.choice(['TRX', 'PIX', 'TED'])}{rng.randint(10**11, 10**12 - 1)}"
+
+
+def generate_report_pdf(
+    pdf_path: Path, pages: int, seed: int = 0
+) -> List[Tuple[str, str]]:
+    """Genera un PDF sintético y devuelve los pares (referencia, renombrado) usados"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    pairs: List[Tuple[str, str]] = []
+    start_date = date(2024, 5, 1)
+
+    for _ in range(pages):
+        page = doc.new_page(width=595, height=842)
+        third = page.rect.height / 3
+
+        for slot in range(rng.randint(1, 3)):
+            y = slot * third + 40
+            reference = _random_reference(rng)
+            rename = f"SOPORTE_{len(pairs) + 1:06d}"
+            pairs.append((reference, rename))
+
+            paid_on = start_date + timedelta(days=rng.randint(0, 30))
+            amount = f"{rng.randint(100, 999_999):,}.{rng.randint(0, 99):02d}"
+            lines = [
+                ("REPORTE PAGOS - COMPROBANTE DE TRANSFERENCIA", 12),
+                (f"{SEARCH_COLUMN}: {reference}", 10),
+                (f"Fecha: {paid_on.strftime('%d/%m/%Y')}", 10),
+                (f"Monto: {amount} BRL", 10),
+                (f"Beneficiario: {rng.choice(BENEFICIARIES)}", 10),
+                (f"Cuenta: {rng.randint(1000, 9999)}-{rng.randint(100000, 999999)}", 10),
+                (f"Banco: {rng.choice(BANKS)}", 10),
+            ]
+            for offset, (line, fontsize) in enumerate(lines):
+                page.insert_text((50, y + offset * 18), line, fontsize=fontsize)
+
+    doc.save(str(pdf_path), garbage=3, deflate=True)
+    doc.close()
+    return pairs
+
+
+def generate_mapping_excel(
+    excel_path: Path, pairs: List[Tuple[str, str]], total_rows: int, seed: int = 0
+):
+    """Genera el Excel de mapeo con los pares del PDF más filas de relleno"""
+    rng = random.Random(seed + 1)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Mapeo")
+    ws.append([SEARCH_COLUMN, RENAME_COLUMN])
+
+    for reference, rename in pairs:
+        ws.append([reference, rename])
+    for i in range(max(total_rows - len(pairs), 0)):
+        ws.append([_random_reference(rng), f"RELLENO_{i + 1:06d}"])
+
+    wb.save(str(excel_path))
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Memoria residente máxima del proceso en MB, si la plataforma la expone"""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(peak / divisor, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def run_benchmark(
+    pages: int, mapping_rows: int, seed: int, work_dir: Path, clip_mode: str
+) -> dict:
+    pdf_path = work_dir / "REPORTE PAGOS sintetico.pdf"
+    excel_path = work_dir / "mapeo_sintetico.xlsx"
+    output_dir = work_dir / "salida"
+
+    started = time.perf_counter()
+    pairs = generate_report_pdf(pdf_path, pages, seed)
+    generate_mapping_excel(excel_path, pairs, mapping_rows, seed)
+    generation_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    processor = PDFProcessor(
+        pdf_path,
+        output_dir,
+        initial_excel_path=str(excel_path),
+        mapping_columns=(SEARCH_COLUMN, RENAME_COLUMN),
+        clip_mode=clip_mode,
+    )
+    load_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    created_files = processor.separate_pages()
+    separate_seconds = time.perf_counter() - started
+
+    doc = fitz.open(str(pdf_path))
+    sample_texts = [doc[i].get_text() for i in range(min(doc.page_count, 50))]
+    doc.close()
+
+    timing_summary = processor.timings.summary()
+    startup_seconds, startup_modules = probe_cli_startup()
+
+    started = time.perf_counter()
+    for text in sample_texts:
+        processor._find_rename_in_text(text)
+    match_seconds = time.perf_counter() - started
+
+    matched = sum(1 for f in created_files if f.rename_value)
+
+    return {
+        "parametros": {
+            "paginas": pages,
+            "soportes_generados": len(pairs),
+            "filas_mapeo": max(mapping_rows, len(pairs)),
+            "semilla": seed,
+            "clip_mode": clip_mode,
+        },
+        "entorno": {
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "plataforma": platform.platform(),
+        },
+        "resultados": {
+            "soportes_creados": len(created_files),
+            "soportes_renombrados": matched,
+            "paginas_por_segundo": round(pages / separate_seconds, 2)
+            if separate_seconds
+            else None,
+            "soportes_por_segundo": round(len(created_files) / separate_seconds, 2)
+            if separate_seconds
+            else None,
+            "busqueda_ms_por_texto": round(match_seconds * 1000 / len(sample_texts), 3)
+            if sample_texts
+            else None,
+            "memoria_pico_mb": peak_rss_mb(),
+            "arranque_cli_help_s": round(startup_seconds, 4),
+            "arranque_cli_modulos_pesados": startup_modules,
+        },
+        "etapas_segundos": {
+            "generacion_datos": round(generation_seconds, 4),
+            "load_excel_mapping": round(load_seconds, 4),
+            "separate_pages": round(separate_seconds, 4),
+            "find_rename_in_text": round(match_seconds, 4),
+        },
+        "etapas_procesador": timing_summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark del procesador de soportes con datos sintéticos"
+    )
+    parser.add_argument("--pages", type=int, default=100, help="Páginas del PDF")
+    parser.add_argument(
+        "--mapping-rows",
+        type=int,
+        default=5000,
+        help="Filas totales del Excel de mapeo (incluye relleno)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Semilla aleatoria")
+    parser.add_argument(
+        "--clip-mode", choices=["xobject", "crop"], default="xobject"
+    )
+    parser.add_argument(
+        "--work-dir",
+        default=None,
+        help="Carpeta para los datos generados (por defecto una temporal)",
+    )
+    parser.add_argument(
+        "-o", "--output", default=None, help="Archivo JSON de resultados"
+    )
+    args = parser.parse_args()
+
+    if args.work_dir:
+        work_dir = Path(args.work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        results = run_benchmark(
+            args.pages, args.mapping_rows, args.seed, work_dir, args.clip_mode
+        )
+    else:
+        with tempfile.TemporaryDirectory(prefix="bench_pdf_") as tmp:
+            results = run_benchmark(
+                args.pages, args.mapping_rows, args.seed, Path(tmp), args.clip_mode
+            )
+
+    payload = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Comprueba que el arranque del CLI no cargue dependencias pesadas.
+
+Ejecuta 'pdf_cli.py --help' en un proceso nuevo y falla (código 1) si en ese
+momento ya están importados PyMuPDF, openpyxl o pandas, o si el arranque supera
+el tiempo máximo indicado.
+
+    python check_startup.py
+    python check_startup.py --max-seconds 0.5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+HEAVY_MODULES = ("fitz", "pymupdf", "openpyxl", "pandas")
+
+# Se ejecuta en el proceso hijo: corre el CLI con --help y lista los módulos
+# pesados que quedaron importados
+_PROBE = """
+import json, runpy, sys
+sys.argv = [{cli!r}, "--help"]
+try:
+    runpy.run_path({cli!r}, run_name="__main__")
+except SystemExit:
+    pass
+sys.stderr.write(json.dumps([m for m in {heavy!r} if m in sys.modules]))
+"""
+
+
+def probe_cli_startup() -> Tuple[float, List[str]]:
+    """Segundos de arranque de 'pdf_cli.py --help' y módulos pesados cargados"""
+    cli_path = Path(__file__).resolve().parent / "pdf_cli.py"
+    code = _PROBE.format(cli=str(cli_path), heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cli_path.parent,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    return elapsed, json.loads(result.stderr.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Comprueba que 'pdf_cli.py --help' no cargue dependencias pesadas"
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Tiempo máximo de arranque permitido (por defecto: sin límite)",
+    )
+    args = parser.parse_args()
+
+    elapsed, loaded = probe_cli_startup()
+    print(f"Arranque de 'pdf_cli.py --help': {elapsed:.3f} s")
+
+    failed = False
+    if loaded:
+        print(f"❌ Módulos pesados importados al arrancar: {', '.join(loaded)}")
+        failed = True
+    if args.max_seconds is not None and elapsed > args.max_seconds:
+        print(f"❌ El arranque supera el máximo de {args.max_seconds:.3f} s")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("✅ El arranque no carga PyMuPDF, openpyxl ni pandas")
+
+
+if __name__ == "__main__":
+    main()
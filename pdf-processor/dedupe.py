@@ -0,0 +1,95 @@
+import hashlib
+from typing import Dict, List, Optional
+
+from matchers import normalize_search_text
+
+# Lado de la cuadrícula del hash perceptual (dHash de 8x8 = 64 bits)
+DHASH_SIZE = 8
+
+# Bits distintos tolerados entre dos soportes para considerarlos iguales
+DHASH_MAX_DISTANCE = 5
+
+
+def text_fingerprint(text: str) -> str:
+    """Hash del texto normalizado, insensible a espacios y puntuación"""
+    return hashlib.sha1(normalize_search_text(text).encode("utf-8")).hexdigest()
+
+
+def dhash(page, clip=None, size: int = DHASH_SIZE) -> int:
+    """Hash perceptual por diferencias de una región renderizada en grises"""
+    import fitz
+
+    rect = fitz.Rect(clip) if clip is not None else page.rect
+    columns = size + 1
+    matrix = fitz.Matrix(columns * 4 / rect.width, size * 4 / rect.height)
+    pix = page.get_pixmap(
+        matrix=matrix, clip=rect, colorspace=fitz.csGRAY, alpha=False
+    )
+
+    totals = [[0] * columns for _ in range(size)]
+    counts = [[0] * columns for _ in range(size)]
+    samples = pix.samples
+    for y in range(pix.height):
+        row = y * size // pix.height
+        offset = y * pix.stride
+        for x in range(pix.width):
+            column = x * columns // pix.width
+            totals[row][column] += samples[offset + x]
+            counts[row][column] += 1
+
+    value = 0
+    for row in range(size):
+        means = [
+            totals[row][c] / counts[row][c] if counts[row][c] else 0
+            for c in range(columns)
+        ]
+        for column in range(size):
+            value = (value << 1) | (means[column] > means[column + 1])
+    return value
+
+
+class _Seen:
+    __slots__ = ("page_num", "clip", "record", "image_hash")
+
+    def __init__(self, page_num, clip, record):
+        self.page_num = page_num
+        self.clip = clip
+        self.record = record
+        self.image_hash: Optional[int] = None
+
+
+class SupportDeduplicator:
+    """Detecta soportes repetidos dentro de un mismo documento.
+
+    Dos soportes son duplicados si su texto normalizado coincide y su imagen
+    renderizada apenas difiere (distancia de Hamming del dHash). El texto se
+    compara por hash y la imagen solo se renderiza cuando el texto coincide,
+    así que los documentos sin repeticiones no pagan ningún renderizado.
+    """
+
+    def __init__(self, pdf_document, max_distance: int = DHASH_MAX_DISTANCE):
+        self.pdf_document = pdf_document
+        self.max_distance = max_distance
+        self._seen: Dict[str, List[_Seen]] = {}
+
+    def _image_hash(self, page_num, clip) -> int:
+        return dhash(self.pdf_document[page_num], clip)
+
+    def find(self, page_num: int, clip, text: str):
+        """Registro del soporte original del que este es copia, o None"""
+        candidates = self._seen.get(text_fingerprint(text))
+        if not candidates:
+            return None
+
+        image_hash = self._image_hash(page_num, clip)
+        for seen in candidates:
+            if seen.image_hash is None:
+                seen.image_hash = self._image_hash(seen.page_num, seen.clip)
+            if bin(seen.image_hash ^ image_hash).count("1") <= self.max_distance:
+                return seen.record
+        return None
+
+    def add(self, page_num: int, clip, text: str, record):
+        self._seen.setdefault(text_fingerprint(text), []).append(
+            _Seen(page_num, clip, record)
+        )
@@ -0,0 +1,248 @@
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Intentos máximos de un trabajo antes de marcarlo como fallido
+MAX_ATTEMPTS = 3
+
+PENDING = "pendiente"
+RUNNING = "en_curso"
+DONE = "hecho"
+FAILED = "fallido"
+
+
+@dataclass(slots=True)
+class MappingSpec:
+    id: int
+    excel: str
+    search_column: str
+    rename_column: str
+
+
+@dataclass(slots=True)
+class Job:
+    id: int
+    pdf: str
+    first_page: int
+    last_page: int
+    mapping_id: int
+    options: dict
+    attempts: int
+    token: str
+
+
+class SqliteJobQueue:
+    """Cola de trabajos en un archivo SQLite, sin servidor intermedio.
+
+    Cada trabajo es un rango de páginas de un PDF con el mapeo que debe usar.
+    Un trabajador lo reclama con una concesión (lease) de duración limitada que
+    renueva mientras trabaja; si el proceso muere, la concesión caduca y otro
+    trabajador puede reclamarlo. Cada reclamo recibe un token propio y solo el
+    intento con el token vigente puede renovar, completar o fallar el trabajo.
+    Cada operación abre su propia conexión y usa transacciones BEGIN IMMEDIATE,
+    así que pueden compartir la cola varios procesos e hilos, incluso en
+    distintas máquinas sobre almacenamiento compartido que respete los
+    bloqueos de archivo.
+    """
+
+    def __init__(self, db_path: Path, max_attempts: int = MAX_ATTEMPTS):
+        self.db_path = Path(db_path)
+        self.max_attempts = max_attempts
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS mapeos (
+                    id INTEGER PRIMARY KEY,
+                    excel TEXT NOT NULL,
+                    columna_busqueda TEXT NOT NULL,
+                    columna_renombrado TEXT NOT NULL,
+                    UNIQUE (excel, columna_busqueda, columna_renombrado)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trabajos (
+                    id INTEGER PRIMARY KEY,
+                    pdf TEXT NOT NULL,
+                    pagina_inicio INTEGER NOT NULL,
+                    pagina_fin INTEGER NOT NULL,
+                    mapeo_id INTEGER NOT NULL REFERENCES mapeos (id),
+                    opciones TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    trabajador TEXT,
+                    lease_hasta REAL,
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    resultado TEXT,
+                    error TEXT,
+                    token TEXT
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(trabajos)")}
+            if "token" not in columns:
+                conn.execute("ALTER TABLE trabajos ADD COLUMN token TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS trabajos_estado ON trabajos (estado, id)"
+            )
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def register_mapping(
+        self, excel: str, search_column: str, rename_column: str
+    ) -> int:
+        """Devuelve el id del mapeo, creándolo si no existía"""
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO mapeos "
+                "(excel, columna_busqueda, columna_renombrado) VALUES (?, ?, ?)",
+                (excel, search_column, rename_column),
+            )
+            return conn.execute(
+                "SELECT id FROM mapeos WHERE excel = ? AND columna_busqueda = ? "
+                "AND columna_renombrado = ?",
+                (excel, search_column, rename_column),
+            ).fetchone()[0]
+
+    def get_mapping(self, mapping_id: int) -> MappingSpec:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id, excel, columna_busqueda, columna_renombrado "
+                "FROM mapeos WHERE id = ?",
+                (mapping_id,),
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"Mapeo no encontrado: {mapping_id}")
+        return MappingSpec(*row)
+
+    def enqueue(
+        self,
+        pdf: str,
+        first_page: int,
+        last_page: int,
+        mapping_id: int,
+        options: Optional[dict] = None,
+    ) -> int:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO trabajos "
+                "(pdf, pagina_inicio, pagina_fin, mapeo_id, opciones, estado) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    pdf,
+                    first_page,
+                    last_page,
+                    mapping_id,
+                    json.dumps(options or {}),
+                    PENDING,
+                ),
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Job]:
+        """Reclama el siguiente trabajo pendiente o con la concesión caducada"""
+        now = time.time()
+        token = uuid.uuid4().hex[:12]
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE trabajos SET estado = ?, error = 'Concesión caducada' "
+                "WHERE estado = ? AND lease_hasta < ? AND intentos >= ?",
+                (FAILED, RUNNING, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id, pdf, pagina_inicio, pagina_fin, mapeo_id, opciones, "
+                "intentos FROM trabajos "
+                "WHERE estado = ? OR (estado = ? AND lease_hasta < ?) "
+                "ORDER BY id LIMIT 1",
+                (PENDING, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE trabajos SET estado = ?, trabajador = ?, lease_hasta = ?, "
+                "intentos = intentos + 1, token = ? WHERE id = ?",
+                (RUNNING, worker, now + lease_seconds, token, row[0]),
+            )
+        return Job(
+            row[0],
+            row[1],
+            row[2],
+            row[3],
+            row[4],
+            json.loads(row[5]),
+            row[6] + 1,
+            token,
+        )
+
+    def renew(self, job_id: int, token: str, lease_seconds: float) -> bool:
+        """Prolonga la concesión; False si otro intento ya reclamó el trabajo"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET lease_hasta = ? "
+                "WHERE id = ? AND token = ? AND estado = ?",
+                (time.time() + lease_seconds, job_id, token, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, token: str, result: dict) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET estado = ?, resultado = ?, lease_hasta = NULL "
+                "WHERE id = ? AND token = ? AND estado = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), job_id, token, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, token: str, error: str):
+        """Devuelve el trabajo a la cola, o lo marca fallido si agotó los intentos"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE trabajos SET "
+                "estado = CASE WHEN intentos >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_hasta = NULL "
+                "WHERE id = ? AND token = ? AND estado = ?",
+                (self.max_attempts, FAILED, PENDING, error, job_id, token, RUNNING),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT estado, COUNT(*) FROM trabajos GROUP BY estado"
+            ).fetchall()
+        return dict(rows)
+
+    def finished_jobs(self) -> List[dict]:
+        """Trabajos terminados, en el orden del documento, con su resultado"""
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, pdf, pagina_inicio, pagina_fin, resultado FROM trabajos "
+                "WHERE estado = ? ORDER BY pdf, pagina_inicio",
+                (DONE,),
+            ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "pdf": row[1],
+                "first_page": row[2],
+                "last_page": row[3],
+                "result": json.loads(row[4]) if row[4] else {},
+            }
+            for row in rows
+        ]
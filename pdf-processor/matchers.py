@@ -0,0 +1,423 @@
+import heapq
+import math
+import re
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+# Longitud aproximada de cada tramo del índice aproximado
+SEGMENT_LENGTH = 3
+
+# Índice de palabras: longitud mínima de palabra, claves máximas por palabra
+# para usarla como pista y fracción mínima del peso de la clave presente
+TOKEN_MIN_LENGTH = 4
+TOKEN_MAX_POSTINGS = 1000
+TOKEN_MIN_SCORE = 0.5
+
+# Claves más largas que se buscan literalmente en el texto de cada soporte
+LONGEST_KEYS = 10
+
+# Longitud de los fragmentos del índice de coincidencias parciales
+PARTIAL_GRAM = 3
+
+
+class MatchCandidate(NamedTuple):
+    """Clave del Excel propuesta para un valor, con su puntuación (0 a 1)"""
+
+    key: str
+    rename_value: str
+    score: float
+    distance: int
+
+
+def normalize_key(value) -> str:
+    """Forma de comparación exacta: sin espacios extremos y sin mayúsculas"""
+    return str(value).strip().casefold()
+
+
+def compact_key(value) -> str:
+    """Forma de comparación aproximada: solo letras y dígitos en minúscula"""
+    return re.sub(r"[\W_]+", "", str(value).casefold())
+
+
+def normalize_search_text(text: str) -> str:
+    """Minúsculas, sin puntuación y con los espacios colapsados"""
+    if not text:
+        return ""
+    normalized = " ".join(text.split())
+    normalized = normalized.lower()
+    normalized = re.sub(r"[^\w\s]", " ", normalized)
+    return " ".join(normalized.split())
+
+
+def _pattern_masks(pattern: str) -> Dict[str, int]:
+    masks: Dict[str, int] = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def _edit_distance(pattern: str, masks: Dict[str, int], text: str) -> int:
+    """Distancia de Levenshtein por vectores de bits (algoritmo de Myers)"""
+    length = len(pattern)
+    if not length:
+        return len(text)
+
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    pv = full
+    mv = 0
+    score = length
+
+    for char in text:
+        eq = masks.get(char, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & full) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & full
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+
+    return score
+
+
+def edit_distance(a: str, b: str) -> int:
+    return _edit_distance(a, _pattern_masks(a), b)
+
+
+class ExactMatcher:
+    """Búsqueda exacta (sin distinguir mayúsculas) en un diccionario"""
+
+    name = "exact"
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = mapping
+        self._index: Dict[str, str] = {}
+        for key in mapping:
+            self._index.setdefault(normalize_key(key), key)
+
+    def match(self, value: str, limit: int = 1) -> List[MatchCandidate]:
+        key = self._index.get(normalize_key(value))
+        if key is None:
+            return []
+        return [MatchCandidate(key, self.mapping[key], 1.0, 0)]
+
+
+def _segments(length: int, count: int) -> List[Tuple[int, int]]:
+    """Divide una longitud en count tramos contiguos de tamaño parecido"""
+    size, extra = divmod(length, count)
+    segments = []
+    start = 0
+    for i in range(count):
+        segment_length = size + (1 if i < extra else 0)
+        segments.append((start, segment_length))
+        start += segment_length
+    return segments
+
+
+class SegmentIndexMatcher:
+    """Búsqueda aproximada con distancia de edición acotada.
+
+    Cada clave compactada se parte en al menos k + 1 tramos. Si una consulta
+    está a distancia <= k de la clave, algún tramo de cualquier grupo de k + 1
+    aparece intacto en la consulta, desplazado como mucho k posiciones. La
+    consulta solo busca los k + 1 tramos con menos claves asociadas y verifica
+    esos candidatos con la distancia exacta, así que el coste depende de lo
+    selectivos que sean los tramos y no del tamaño del mapeo.
+    """
+
+    name = "fuzzy"
+
+    def __init__(self, mapping: Dict[str, str], max_distance: int = 2):
+        self.mapping = mapping
+        self.max_distance = max(int(max_distance), 1)
+        self._keys: Dict[str, List[str]] = {}
+        self._index: Dict[Tuple[int, int, str], List[str]] = {}
+        self._segments_by_length: Dict[int, List[Tuple[int, int]]] = {}
+        self._short: List[str] = []
+
+        for key in mapping:
+            compact = compact_key(key)
+            if not compact:
+                continue
+            if compact in self._keys:
+                self._keys[compact].append(key)
+            else:
+                self._keys[compact] = [key]
+                self._add(compact)
+
+    def _segments_for(self, length: int) -> List[Tuple[int, int]]:
+        segments = self._segments_by_length.get(length)
+        if segments is None:
+            count = max(self.max_distance + 1, length // SEGMENT_LENGTH)
+            segments = _segments(length, count)
+            self._segments_by_length[length] = segments
+        return segments
+
+    def _add(self, compact: str):
+        length = len(compact)
+        if length <= self.max_distance:
+            self._short.append(compact)
+            return
+        for i, (start, size) in enumerate(self._segments_for(length)):
+            piece = compact[start : start + size]
+            self._index.setdefault((length, i, piece), []).append(compact)
+
+    def _candidates(self, query: str, bound: int) -> Set[str]:
+        candidates: Set[str] = set(self._short)
+        query_length = len(query)
+
+        for length in range(query_length - bound, query_length + bound + 1):
+            segments = self._segments_by_length.get(length)
+            if not segments:
+                continue
+
+            lookups = []
+            for i, (start, size) in enumerate(segments):
+                buckets = []
+                for shift in range(-bound, bound + 1):
+                    position = start + shift
+                    if position < 0 or position + size > query_length:
+                        continue
+                    bucket = self._index.get(
+                        (length, i, query[position : position + size])
+                    )
+                    if bucket:
+                        buckets.append(bucket)
+                lookups.append((sum(len(b) for b in buckets), buckets))
+
+            lookups.sort(key=lambda item: item[0])
+            for _, buckets in lookups[: bound + 1]:
+                for bucket in buckets:
+                    candidates.update(bucket)
+
+        return candidates
+
+    def match(
+        self, value: str, limit: int = 5, max_distance: Optional[int] = None
+    ) -> List[MatchCandidate]:
+        """Devuelve las claves más cercanas, ordenadas por puntuación"""
+        query = compact_key(value)
+        if not query:
+            return []
+
+        bound = self.max_distance
+        if max_distance is not None:
+            bound = min(max_distance, self.max_distance)
+        masks = _pattern_masks(query)
+
+        found = []
+        for compact in self._candidates(query, bound):
+            if abs(len(compact) - len(query)) > bound:
+                continue
+            distance = _edit_distance(query, masks, compact)
+            if distance <= bound:
+                found.append((distance, compact))
+
+        candidates = []
+        for distance, compact in sorted(found):
+            score = 1.0 - distance / max(len(query), len(compact))
+            for key in self._keys[compact]:
+                candidates.append(
+                    MatchCandidate(key, self.mapping[key], round(score, 3), distance)
+                )
+        return candidates[:limit]
+
+
+class TokenIndex:
+    """Índice invertido de palabras de las claves, ponderado por IDF.
+
+    Cada clave se puntúa por la fracción de su peso (suma de IDF de sus
+    palabras) que aparece en el texto. Solo se recorren las claves asociadas a
+    las palabras del texto, así que el coste depende del tamaño de la página y
+    no del mapeo. Las palabras presentes en demasiadas claves no sirven para
+    proponer candidatas, aunque siguen contando en el peso de cada clave.
+    """
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = mapping
+        self._postings: Dict[str, List[str]] = {}
+        self._key_weight: Dict[str, float] = {}
+        self._idf: Dict[str, float] = {}
+
+        key_tokens: Dict[str, Set[str]] = {}
+        for key in mapping:
+            tokens = {
+                token
+                for token in normalize_search_text(str(key)).split()
+                if len(token) >= TOKEN_MIN_LENGTH
+            }
+            if not tokens:
+                continue
+            key_tokens[key] = tokens
+            for token in tokens:
+                self._postings.setdefault(token, []).append(key)
+
+        total = len(key_tokens)
+        for token, keys in self._postings.items():
+            self._idf[token] = math.log(1 + total / len(keys))
+        for key, tokens in key_tokens.items():
+            self._key_weight[key] = sum(self._idf[token] for token in tokens)
+
+    def match(self, normalized_text: str) -> Optional[MatchCandidate]:
+        """Clave con mayor proporción de peso presente en el texto normalizado"""
+        matched: Dict[str, float] = {}
+        for token in set(normalized_text.split()):
+            keys = self._postings.get(token)
+            if not keys or len(keys) > TOKEN_MAX_POSTINGS:
+                continue
+            weight = self._idf[token]
+            for key in keys:
+                matched[key] = matched.get(key, 0.0) + weight
+
+        best = None
+        best_rank = (0.0, 0.0)
+        for key, weight in matched.items():
+            score = weight / self._key_weight[key]
+            if score < TOKEN_MIN_SCORE:
+                continue
+            rank = (score, weight)
+            if best is None or rank > best_rank:
+                best = key
+                best_rank = rank
+
+        if best is None:
+            return None
+        return MatchCandidate(best, self.mapping[best], round(best_rank[0], 3), 0)
+
+
+class PartialMatcher:
+    """Coincidencia parcial: el valor contiene a la clave o está dentro de ella.
+
+    Devuelve la primera clave del mapeo (en su orden) que cumple alguna de las
+    dos condiciones, sin distinguir mayúsculas. Las claves contenidas en el
+    valor se buscan por sus subcadenas en un diccionario; las que contienen al
+    valor, recorriendo solo las claves del fragmento de PARTIAL_GRAM caracteres
+    del valor que aparece en menos claves. El índice de fragmentos se construye
+    en la primera consulta que lo necesita.
+    """
+
+    name = "partial"
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = mapping
+        self._keys = list(mapping)
+        self._lowered = [str(key).strip().lower() for key in self._keys]
+        self._by_lowered: Dict[str, int] = {}
+        for position, lowered in enumerate(self._lowered):
+            self._by_lowered.setdefault(lowered, position)
+        self._max_length = max(map(len, self._lowered), default=0)
+        self._grams: Dict[int, Dict[str, List[int]]] = {}
+
+    def _gram_index(self, size: int) -> Dict[str, List[int]]:
+        index = self._grams.get(size)
+        if index is None:
+            index = {}
+            for position, lowered in enumerate(self._lowered):
+                for gram in {
+                    lowered[i : i + size] for i in range(len(lowered) - size + 1)
+                }:
+                    index.setdefault(gram, []).append(position)
+            self._grams[size] = index
+        return index
+
+    def _first_containing(self, query: str) -> Optional[int]:
+        """Posición de la primera clave que contiene a la consulta"""
+        size = min(PARTIAL_GRAM, len(query))
+        index = self._gram_index(size)
+        rarest = None
+        for gram in {query[i : i + size] for i in range(len(query) - size + 1)}:
+            positions = index.get(gram)
+            if not positions:
+                return None
+            if rarest is None or len(positions) < len(rarest):
+                rarest = positions
+
+        for position in rarest:
+            if query in self._lowered[position]:
+                return position
+        return None
+
+    def _first_contained(self, query: str) -> Optional[int]:
+        """Posición de la primera clave contenida en la consulta"""
+        found = self._by_lowered.get("")
+        for start in range(len(query)):
+            for end in range(start + 1, min(start + self._max_length, len(query)) + 1):
+                position = self._by_lowered.get(query[start:end])
+                if position is not None and (found is None or position < found):
+                    found = position
+        return found
+
+    def match(self, value: str, limit: int = 1) -> List[MatchCandidate]:
+        query = str(value).lower()
+        if not query or not self._keys:
+            return []
+
+        positions = [
+            position
+            for position in (self._first_containing(query), self._first_contained(query))
+            if position is not None
+        ]
+        if not positions:
+            return []
+        position = min(positions)
+        key = self._keys[position]
+        lengths = sorted((len(query), len(self._lowered[position])))
+        score = lengths[0] / lengths[1] if lengths[1] else 1.0
+        return [MatchCandidate(key, self.mapping[key], round(score, 3), 0)]
+
+
+MATCHERS = {
+    "exact": ExactMatcher,
+    "fuzzy": SegmentIndexMatcher,
+}
+
+
+class MatcherEngine:
+    """Combina los motores de coincidencia configurados para un mapeo.
+
+    La búsqueda exacta siempre está activa; la aproximada solo se construye
+    si se pide una distancia de edición mayor que cero. Lo que no depende del
+    texto de cada soporte (las claves más largas ya normalizadas y la clave de
+    origen de cada valor de renombrado) se calcula aquí una sola vez.
+    """
+
+    def __init__(self, mapping: Dict[str, str], fuzzy_distance: int = 0):
+        self.mapping = mapping
+        self.fuzzy_distance = max(int(fuzzy_distance or 0), 0)
+        self.exact = MATCHERS["exact"](mapping)
+        self.fuzzy = (
+            MATCHERS["fuzzy"](mapping, self.fuzzy_distance)
+            if self.fuzzy_distance
+            else None
+        )
+        self.tokens = TokenIndex(mapping)
+        self.partial = PartialMatcher(mapping)
+        self.longest_keys: List[Tuple[str, str]] = [
+            (key, normalize_search_text(str(key)))
+            for key in heapq.nlargest(LONGEST_KEYS, mapping, key=lambda k: len(str(k)))
+        ]
+        self.key_for_rename: Dict[str, str] = {}
+        for key, rename_value in mapping.items():
+            self.key_for_rename.setdefault(rename_value, key)
+
+    def match_exact(self, value: str) -> Optional[MatchCandidate]:
+        candidates = self.exact.match(value)
+        return candidates[0] if candidates else None
+
+    def match_fuzzy(self, value: str, limit: int = 5) -> List[MatchCandidate]:
+        if self.fuzzy is None:
+            return []
+        return self.fuzzy.match(value, limit=limit)
+
+    def match_partial(self, value: str) -> Optional[MatchCandidate]:
+        candidates = self.partial.match(value)
+        return candidates[0] if candidates else None
+
+    def match_tokens(self, normalized_text: str) -> Optional[MatchCandidate]:
+        return self.tokens.match(normalized_text)
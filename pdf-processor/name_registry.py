@@ -0,0 +1,74 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Set
+
+
+class OutputNameRegistry:
+    """Asigna nombres de archivo únicos en un directorio sin sondear el disco.
+
+    El directorio se escanea una sola vez al crear el registro; a partir de ahí
+    los nombres ocupados y el siguiente sufijo de cada nombre base se llevan en
+    memoria. Cada nombre asignado se reserva creando el archivo con O_EXCL, de
+    modo que varios procesos escribiendo en el mismo directorio no se pisan.
+    """
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self._taken: Set[str] = set()
+        self._next_counter: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        try:
+            with os.scandir(self.base_dir) as entries:
+                for entry in entries:
+                    self._taken.add(os.path.normcase(entry.name))
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+
+    def _reserve(self, path: Path) -> bool:
+        try:
+            fd = os.open(str(path), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def allocate(self, filename: str, reserve: bool = True) -> Path:
+        """Devuelve una ruta libre para el nombre pedido, añadiendo _N si hace falta"""
+        stem, extension = os.path.splitext(filename)
+        base_key = os.path.normcase(filename)
+
+        with self._lock:
+            candidate = filename
+            counter = self._next_counter.get(base_key, 1)
+
+            while True:
+                key = os.path.normcase(candidate)
+                if key not in self._taken:
+                    self._taken.add(key)
+                    path = self.base_dir / candidate
+                    if not reserve or self._reserve(path):
+                        self._next_counter[base_key] = counter
+                        return path
+
+                candidate = f"{stem}_{counter}{extension}"
+                counter += 1
+
+    def discard(self, path: Path):
+        """Borra un archivo de salida y deja su nombre libre para reasignarlo"""
+        path = Path(path)
+        with self._lock:
+            path.unlink(missing_ok=True)
+            self._taken.discard(os.path.normcase(path.name))
+
+    def release(self, path: Path):
+        """Elimina la reserva de un nombre cuyo archivo no llegó a escribirse"""
+        path = Path(path)
+        try:
+            if path.exists() and path.stat().st_size == 0:
+                path.unlink()
+        except OSError:
+            pass
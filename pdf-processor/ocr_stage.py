@@ -0,0 +1,138 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from logger_config import get_logger
+
+# Documento abierto por cada proceso del pool, reutilizado entre páginas
+_worker_document = None
+
+
+def ocr_available() -> bool:
+    """Indica si PyMuPDF encuentra una instalación local de Tesseract"""
+    import fitz
+
+    try:
+        fitz.get_tessdata()
+        return True
+    except Exception:
+        return False
+
+
+def page_content_hash(pdf_document, page_num: int) -> str:
+    """Hash del contenido de una página (flujo de contenido e imágenes)"""
+    page = pdf_document[page_num]
+    digest = hashlib.sha256()
+    digest.update(f"{page.rect}|{page.rotation}".encode("utf-8"))
+    digest.update(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(pdf_document.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+
+def is_scanned_candidate(page) -> bool:
+    """Página sin fuentes pero con imágenes: no puede tener texto digital"""
+    return not page.get_fonts() and bool(page.get_images())
+
+
+def _init_worker(pdf_path: str):
+    import fitz
+
+    global _worker_document
+    _worker_document = fitz.open(pdf_path)
+
+
+def _ocr_page(page_num: int, dpi: int, language: str) -> str:
+    page = _worker_document[page_num]
+    textpage = page.get_textpage_ocr(language=language, dpi=dpi, full=True)
+    return page.get_text(textpage=textpage)
+
+
+class OcrStage:
+    """Obtiene por OCR el texto de páginas escaneadas usando un pool de procesos.
+
+    El renderizado y el reconocimiento de cada página se hacen en procesos
+    separados, cada uno con su propia copia abierta del PDF. Los resultados se
+    guardan en la caché persistente indexados por el hash del contenido de la
+    página, de modo que un mismo escaneo no se reconoce dos veces.
+    """
+
+    def __init__(
+        self,
+        pdf_path: Path,
+        dpi: int = 300,
+        language: str = "spa+eng",
+        workers: Optional[int] = None,
+        cache=None,
+    ):
+        self.pdf_path = Path(pdf_path)
+        self.dpi = dpi
+        self.language = language
+        self.workers = workers or max((os.cpu_count() or 2) - 1, 1)
+        self.cache = cache
+        self.logger = get_logger("pdf_processor")
+
+    def run(self, pdf_document, page_numbers: Iterable[int]) -> Dict[int, str]:
+        """Devuelve el texto reconocido de cada página indicada"""
+        results: Dict[int, str] = {}
+        pending: Dict[int, str] = {}
+
+        for page_num in page_numbers:
+            content_hash = page_content_hash(pdf_document, page_num)
+            cached_text = None
+            if self.cache is not None:
+                cached_text = self.cache.get_ocr(content_hash, self.dpi, self.language)
+            if cached_text is not None:
+                results[page_num] = cached_text
+            else:
+                pending[page_num] = content_hash
+
+        if results:
+            self.logger.info(f"🔎 OCR: {len(results)} página(s) reutilizadas desde caché")
+        if not pending:
+            return results
+
+        self.logger.info(
+            f"🔎 OCR: reconociendo {len(pending)} página(s) a {self.dpi} dpi "
+            f"con {self.workers} proceso(s)"
+        )
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(pending)),
+            initializer=_init_worker,
+            initargs=(str(self.pdf_path),),
+        ) as pool:
+            futures = {
+                pool.submit(_ocr_page, page_num, self.dpi, self.language): page_num
+                for page_num in pending
+            }
+            for future in as_completed(futures):
+                page_num = futures[future]
+                try:
+                    text = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error de OCR en página {page_num + 1}: {e}")
+                    continue
+
+                results[page_num] = text
+                if self.cache is not None:
+                    self.cache.put_ocr(
+                        pending[page_num], self.dpi, self.language, text
+                    )
+
+        return results
+
+
+def find_scanned_pages(
+    pdf_document, page_numbers: Optional[Iterable[int]] = None
+) -> List[int]:
+    """Páginas candidatas a OCR, detectadas sin extraer su texto"""
+    if page_numbers is None:
+        page_numbers = range(pdf_document.page_count)
+    return [
+        page_num
+        for page_num in page_numbers
+        if is_scanned_candidate(pdf_document[page_num])
+    ]
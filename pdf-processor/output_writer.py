@@ -0,0 +1,65 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+
+class AsyncFileWriter:
+    """Escribe archivos en hilos de fondo con un límite de trabajos pendientes.
+
+    El hilo de procesamiento genera los contenidos en memoria y los entrega con
+    write_bytes; un grupo acotado de hilos los vuelca a disco. Cuando hay
+    max_pending escrituras en cola, write_bytes espera a que termine alguna, de
+    modo que la memoria usada por los buffers pendientes queda limitada.
+    Cada escritura devuelve un Future que termina cuando el archivo ya está en
+    disco (o falló y se notificó a on_error).
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_pending: int = 32,
+        on_written: Optional[Callable[[float], None]] = None,
+    ):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pdf-writer"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._on_written = on_written
+        self._errors: List[Tuple[Path, Exception]] = []
+        self._lock = threading.Lock()
+
+    def write_bytes(
+        self,
+        path: Path,
+        data: bytes,
+        on_error: Optional[Callable[[Path, Exception], None]] = None,
+    ) -> Future:
+        self._slots.acquire()
+        try:
+            return self._executor.submit(self._write, Path(path), data, on_error)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _write(self, path: Path, data: bytes, on_error):
+        started = time.perf_counter()
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+        except Exception as e:
+            with self._lock:
+                self._errors.append((path, e))
+            if on_error is not None:
+                on_error(path, e)
+        finally:
+            self._slots.release()
+            if self._on_written is not None:
+                self._on_written(time.perf_counter() - started)
+
+    def close(self) -> List[Tuple[Path, Exception]]:
+        """Espera a que terminen las escrituras pendientes y devuelve los errores"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            return list(self._errors)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+# Cada cuántas páginas se confirma la transacción; ante una caída se pierden
+# como mucho las últimas páginas no confirmadas
+COMMIT_EVERY = 25
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula el SHA-256 de un archivo leyéndolo por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PageResultCache:
+    """Caché persistente (SQLite) de resultados por página.
+
+    Cada entrada se identifica por el hash del PDF de entrada, el índice de la
+    página y la versión del procesador. El contenido guarda el hash del mapeo
+    con el que se calculó, las regiones detectadas, el texto de cada soporte y
+    la decisión de renombrado, para que una reanudación pueda reutilizarlos.
+    """
+
+    def __init__(self, db_path: Path, processor_version: str):
+        self.db_path = Path(db_path)
+        self.processor_version = processor_version
+        self._pending = 0
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS paginas (
+                pdf_hash TEXT NOT NULL,
+                pagina INTEGER NOT NULL,
+                version TEXT NOT NULL,
+                mapeo_hash TEXT NOT NULL,
+                datos TEXT NOT NULL,
+                PRIMARY KEY (pdf_hash, pagina, version)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ocr (
+                pagina_hash TEXT NOT NULL,
+                dpi INTEGER NOT NULL,
+                idioma TEXT NOT NULL,
+                texto TEXT NOT NULL,
+                PRIMARY KEY (pagina_hash, dpi, idioma)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, pdf_hash: str, page_index: int) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT mapeo_hash, datos FROM paginas "
+            "WHERE pdf_hash = ? AND pagina = ? AND version = ?",
+            (pdf_hash, page_index, self.processor_version),
+        ).fetchone()
+        if row is None:
+            return None
+        entry = json.loads(row[1])
+        entry["mapping_hash"] = row[0]
+        return entry
+
+    def put(self, pdf_hash: str, page_index: int, mapping_hash: str, entry: dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO paginas "
+            "(pdf_hash, pagina, version, mapeo_hash, datos) VALUES (?, ?, ?, ?, ?)",
+            (
+                pdf_hash,
+                page_index,
+                self.processor_version,
+                mapping_hash,
+                json.dumps(entry, ensure_ascii=False),
+            ),
+        )
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def get_ocr(self, page_hash: str, dpi: int, language: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT texto FROM ocr WHERE pagina_hash = ? AND dpi = ? AND idioma = ?",
+            (page_hash, dpi, language),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def put_ocr(self, page_hash: str, dpi: int, language: str, text: str):
+        # El OCR es caro: se confirma en cuanto se obtiene cada página
+        self._conn.execute(
+            "INSERT OR REPLACE INTO ocr (pagina_hash, dpi, idioma, texto) "
+            "VALUES (?, ?, ?, ?)",
+            (page_hash, dpi, language, text),
+        )
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self):
+        if self._conn is None:
+            return
+        self._conn.commit()
+        self._conn.close()
+        self._conn = None
@@ -1,10 +1,22 @@
 import sys
 import argparse
-import fitz
-from pdf_core import PDFProcessor
+import multiprocessing
 from logger_config import setup_default_logging
 
 
+def page_range(value: str):
+    """Convierte 'INICIO-FIN' (o un solo número) en una tupla de páginas"""
+    first, _, last = value.partition("-")
+    try:
+        first_page = int(first)
+        last_page = int(last) if last else first_page
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Rango de páginas no válido: '{value}'")
+    if first_page < 1 or last_page < first_page:
+        raise argparse.ArgumentTypeError(f"Rango de páginas no válido: '{value}'")
+    return first_page, last_page
+
+
 def main():
     """Función principal del CLI"""
     setup_default_logging()
@@ -43,9 +55,112 @@ Ejemplos de uso:
 
     parser.add_argument(
         "--export-format",
-        choices=["csv", "xlsx"],
+        choices=["csv", "xlsx", "jsonl", "parquet"],
         default="csv",
-        help="Formato de exportación de datos (csv o xlsx)",
+        help="Formato de exportación de datos (csv, xlsx, jsonl o parquet; parquet requiere pyarrow)",
+    )
+
+    parser.add_argument(
+        "--pages",
+        type=page_range,
+        default=None,
+        help="Procesar solo un rango de páginas, por ejemplo 1-50 (por defecto: todas)",
+    )
+
+    parser.add_argument(
+        "--clip-mode",
+        choices=["xobject", "crop"],
+        default="xobject",
+        help=(
+            "Cómo generar soportes de páginas con varios soportes: 'xobject' incrusta "
+            "la página completa recortada, 'crop' copia solo el contenido de la región"
+        ),
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Reanudar un procesamiento anterior en la misma carpeta de salida, "
+            "rehaciendo solo las páginas o soportes cuyos datos cambiaron"
+        ),
+    )
+
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=(
+            "Guardar la caché de páginas (.cache_paginas.sqlite) para poder "
+            "reanudar después con --resume; --resume la activa siempre"
+        ),
+    )
+
+    parser.add_argument(
+        "--writer-threads",
+        type=int,
+        default=4,
+        help="Hilos dedicados a escribir archivos en disco (0 = escritura síncrona)",
+    )
+
+    parser.add_argument(
+        "--fuzzy-distance",
+        type=int,
+        default=0,
+        help=(
+            "Distancia de edición máxima para aceptar coincidencias aproximadas "
+            "con el Excel (por defecto: 0, desactivado)"
+        ),
+    )
+
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help=(
+            "Escribir una sola vez los soportes repetidos (mismo texto e imagen) "
+            "y anotar los duplicados en los informes"
+        ),
+    )
+
+    parser.add_argument(
+        "--archive",
+        choices=["zip", "tar"],
+        default=None,
+        help=(
+            "Guardar los soportes en un único archivo zip o tar con un manifiesto, "
+            "en lugar de un PDF suelto por soporte"
+        ),
+    )
+
+    parser.add_argument(
+        "--ocr",
+        action="store_true",
+        help="Reconocer por OCR las páginas escaneadas sin texto (requiere Tesseract)",
+    )
+
+    parser.add_argument(
+        "--ocr-dpi",
+        type=int,
+        default=300,
+        help="Resolución de renderizado para el OCR (por defecto: 300)",
+    )
+
+    parser.add_argument(
+        "--ocr-language",
+        default="spa+eng",
+        help="Idiomas de Tesseract para el OCR (por defecto: spa+eng)",
+    )
+
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=None,
+        help="Procesos paralelos para el OCR (por defecto: núcleos - 1)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Guardar un perfil cProfile (perfil.pstats) en la carpeta de salida",
     )
 
     parser.add_argument(
@@ -68,36 +183,66 @@ Ejemplos de uso:
 
     args = parser.parse_args()
 
+    from pdf_core import PDFProcessor
+
     try:
         mapping = (args.search_column, args.rename_column)
         processor = PDFProcessor(
             args.input_pdf,
             args.output,
             export_format=args.export_format,
+            clip_mode=args.clip_mode,
+            resume=args.resume,
+            use_page_cache=args.cache,
+            writer_threads=args.writer_threads,
+            ocr=args.ocr,
+            ocr_dpi=args.ocr_dpi,
+            ocr_language=args.ocr_language,
+            ocr_workers=args.ocr_workers,
+            fuzzy_distance=args.fuzzy_distance,
+            dedupe=args.dedupe,
+            pages=args.pages,
+            archive_format=args.archive,
             initial_excel_path=args.initial_excel,
             mapping_columns=mapping,
         )
 
         processor.validate_input()
 
-        print(f"Iniciando procesamiento de: {args.input_pdf}")
+        profiler = None
+        if args.profile:
+            import cProfile
 
-        created_files = processor.separate_pages()
+            profiler = cProfile.Profile()
+            profiler.enable()
 
-        if args.extract_text:
-            print("Extrayendo texto de las páginas...")
-            processor.extract_text_from_pages()
+        print(f"Iniciando procesamiento de: {args.input_pdf}")
 
+        if args.extract_text:
+            print("Se extraerá también el texto de las páginas")
         if args.detailed_info:
-            print("Extrayendo información detallada de soportes...")
-            pdf_doc = fitz.open(args.input_pdf)
-            metadata = processor.extract_metadata(pdf_doc)
-            pdf_doc.close()
-            processor.create_detailed_summary_report(metadata, created_files)
+            print("Se generará el informe detallado de soportes")
+
+        with processor:
+            created_files = processor.process(
+                extract_text=args.extract_text, detailed_info=args.detailed_info
+            )
+
+        if profiler is not None:
+            profiler.disable()
+            processor.create_output_directory()
+            profile_path = processor.output_dir / "perfil.pstats"
+            profiler.dump_stats(str(profile_path))
+            print(f"🧪 Perfil guardado en: {profile_path}")
 
         print("\n✅ Procesamiento completado!")
-        print(f"📁 Archivos creados: {len(created_files)}")
+        duplicates = sum(1 for info in created_files if info.duplicate_of)
+        print(f"📁 Archivos creados: {len(created_files) - duplicates}")
+        if duplicates:
+            print(f"♊ Soportes duplicados omitidos: {duplicates}")
         print(f"📂 Ubicación: {processor.output_dir}")
+        if processor.archive_path is not None:
+            print(f"🗜️ Archivo de soportes: {processor.archive_path}")
 
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -105,4 +250,6 @@ Ejemplos de uso:
 
 
 if __name__ == "__main__":
+    # Necesario para el pool de procesos del OCR en ejecutables congelados
+    multiprocessing.freeze_support()
     main()
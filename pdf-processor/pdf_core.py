@@ -1,15 +1,213 @@
+from collections import deque
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
-import fitz
+import hashlib
+import json
+import mmap
 import re
-from typing import Dict, Optional, Tuple, List
+from typing import Deque, Dict, Optional, Tuple, List
+from archive_writer import ARCHIVE_FORMATS, SupportArchive
+from dedupe import SupportDeduplicator
 from logger_config import get_logger
+from matchers import MatcherEngine, normalize_search_text
+from name_registry import OutputNameRegistry
+from ocr_stage import OcrStage, find_scanned_pages, ocr_available
+from output_writer import AsyncFileWriter
+from records import ReportRow, SupportFile
+from page_cache import PageResultCache, file_sha256
+from report_writers import REPORT_WRITERS, open_report_writer
+from stage_timer import StageTimer
+from word_layout import WordLayout
+
+# PyMuPDF (fitz) y openpyxl se importan dentro de los métodos que los usan para
+# que el arranque del CLI (--help, validación de argumentos) no pague su carga.
+
+
+PAYMENT_INDICATORS = (
+    "comprobante",
+    "soporte",
+    "pago",
+    "transferencia",
+    "payment",
+    "receipt",
+    "voucher",
+    "transaction",
+    "reference",
+    "número de referencia",
+    "transaction reference number",
+    "numero de transaccion",
+    "codigo de transaccion",
+    "ref:",
+    "reference:",
+    "nro:",
+    "numero:",
+    "fecha:",
+    "date:",
+    "valor:",
+    "amount:",
+    "monto:",
+    "beneficiario:",
+    "destinatario:",
+    "cuenta:",
+    "account:",
+    "banco:",
+    "bank:",
+)
+
+# Versión de la lógica de detección y renombrado; cambiarla invalida la caché
+# persistente de páginas
+PROCESSOR_VERSION = "1"
+PAGE_CACHE_FILENAME = ".cache_paginas.sqlite"
+
+# Rótulos (por prioridad), patrón del valor y si admite varias palabras, para
+# la extracción por coordenadas de los datos de pago
+PAYMENT_FIELD_LAYOUT = {
+    "reference_number": (
+        (
+            "transaction reference number",
+            "reference number",
+            "reference",
+            "referencia",
+            "ref",
+            "número",
+            "numero",
+            "nro",
+            "codigo",
+        ),
+        # Al menos un dígito y cuatro caracteres, para no tomar palabras como
+        # "de" en "Número de referencia"
+        r"(?=[A-Z0-9\-]*\d)[A-Z0-9\-]{4,}",
+        False,
+    ),
+    "amount": (("valor", "amount", "monto"), r"[0-9][0-9,\.]*", False),
+    "date": (
+        ("fecha", "date"),
+        r"[0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4}",
+        False,
+    ),
+    "beneficiary": (
+        ("beneficiario", "destinatario", "to"),
+        r"[A-Za-z][A-Za-z\s]*",
+        True,
+    ),
+    "account": (("cuenta", "account"), r"[0-9][0-9\-]*", False),
+    "bank": (("banco", "bank"), r"[A-Za-z][A-Za-z\s]*", True),
+}
+
+# Tamaño de celda (en puntos) para cuantizar posiciones de bloques en la huella
+LAYOUT_GRID = 10
+LAYOUT_CACHE_MAX = 256
+
+
+def load_excel_mapping(
+    excel_path, search_col_name: str, rename_col_name: str
+) -> Dict[str, str]:
+    """Lee el mapeo búsqueda -> renombrado de la hoja activa del Excel"""
+    logger = get_logger("pdf_processor")
+    excel_path = Path(excel_path)
+    try:
+        from openpyxl import load_workbook
+    except Exception:
+        raise RuntimeError(
+            "openpyxl no está instalado. No se puede leer el Excel inicial."
+        )
+    if not excel_path.exists():
+        raise FileNotFoundError(f"Excel no encontrado: {excel_path}")
+
+    wb = load_workbook(filename=str(excel_path), read_only=True, data_only=True)
+    ws = wb.active
+
+    headers: List[str] = []
+    for cell in ws[1]:
+        cell_value = cell.value
+        if cell_value is not None:
+            headers.append(str(cell_value).strip())
+        else:
+            headers.append("")
+
+    logger.debug(f"Headers encontrados: {headers}")
+
+    norm_headers = {
+        h.strip().casefold(): i for i, h in enumerate(headers) if h.strip()
+    }
+    s_key = (search_col_name or "").strip().casefold()
+    r_key = (rename_col_name or "").strip().casefold()
+
+    if s_key not in norm_headers or r_key not in norm_headers:
+        wb.close()
+        available_headers = [h for h in headers if h.strip()]
+        raise ValueError(
+            "No se encontraron las columnas seleccionadas en el Excel. "
+            f"Disponibles: {', '.join([repr(h) for h in available_headers])}"
+        )
+
+    search_idx = norm_headers[s_key]
+    rename_idx = norm_headers[r_key]
+
+    mapping: Dict[str, str] = {}
+    processed_rows = 0
+    empty_rows = 0
+
+    for row_num, row in enumerate(ws.iter_rows(min_row=2), start=2):
+        processed_rows += 1
+
+        s_val = row[search_idx].value if len(row) > search_idx else None
+        r_val = row[rename_idx].value if len(row) > rename_idx else None
+
+        if s_val is None and r_val is None:
+            empty_rows += 1
+            continue
+
+        if s_val is None or r_val is None:
+            logger.warning(
+                f"Fila {row_num}: Valor faltante - Búsqueda: '{s_val}', Renombrado: '{r_val}'"
+            )
+            continue
+
+        s = str(s_val).strip()
+        r = str(r_val).strip()
+
+        if not s or not r:
+            logger.warning(
+                f"Fila {row_num}: Valores vacíos después de normalizar - Búsqueda: '{s}', Renombrado: '{r}'"
+            )
+            continue
+
+        if s in mapping:
+            logger.warning(
+                f"Fila {row_num}: Valor de búsqueda duplicado '{s}' - manteniendo primer valor '{mapping[s]}'"
+            )
+            continue
+
+        mapping[s] = r
+        logger.debug(f"Fila {row_num}: Mapeado '{s}' -> '{r}'")
 
-try:
-    from openpyxl import load_workbook
-    from openpyxl import Workbook
-except Exception:
-    load_workbook = None
-    Workbook = None
+    wb.close()
+
+    logger.info(
+        f"Procesadas {processed_rows} filas, {empty_rows} vacías, {len(mapping)} mapeos válidos"
+    )
+
+    if not mapping:
+        raise ValueError(
+            "No se pudo crear ningún mapeo válido desde el Excel. "
+            "Verifique que las columnas tengan datos."
+        )
+
+    return mapping
+
+
+@dataclass(slots=True)
+class _PendingPage:
+    """Resultado de una página que espera a que terminen sus escrituras"""
+
+    writes: List[Future] = field(default_factory=list)
+    rows: List[Tuple[str, ReportRow]] = field(default_factory=list)
+    cache_entry: Optional[Tuple[int, dict]] = None
 
 
 class PDFProcessor:
@@ -20,6 +218,21 @@ class PDFProcessor:
         export_format: str = "csv",
         initial_excel_path: Optional[str] = None,
         mapping_columns: Optional[Tuple[str, str]] = None,
+        clip_mode: str = "xobject",
+        resume: bool = False,
+        use_page_cache: bool = False,
+        writer_threads: int = 4,
+        ocr: bool = False,
+        ocr_dpi: int = 300,
+        ocr_language: str = "spa+eng",
+        ocr_workers: Optional[int] = None,
+        fuzzy_distance: int = 0,
+        dedupe: bool = False,
+        pages: Optional[Tuple[int, int]] = None,
+        report_dir=None,
+        mapping: Optional[Dict[str, str]] = None,
+        matcher: Optional[MatcherEngine] = None,
+        archive_format: Optional[str] = None,
     ):
         self.input_pdf_path = Path(input_pdf_path)
         self.output_dir = (
@@ -27,17 +240,56 @@ class PDFProcessor:
             if output_dir
             else self.input_pdf_path.parent / "soportes_separados"
         )
+        self.report_dir = Path(report_dir) if report_dir else self.output_dir
+        self.pages = pages
         self.export_format = (export_format or "csv").lower()
-        if self.export_format not in ("csv", "xlsx"):
+        if self.export_format not in REPORT_WRITERS:
             self.export_format = "csv"
+        self.clip_mode = (clip_mode or "xobject").lower()
+        if self.clip_mode not in ("xobject", "crop"):
+            self.clip_mode = "xobject"
         self.initial_excel_path = (
             Path(initial_excel_path) if initial_excel_path else None
         )
         self.mapping_columns = mapping_columns
         self.search_to_rename_map: Dict[str, str] = {}
         self.logger = get_logger("pdf_processor")
-
-        if self.initial_excel_path and self.mapping_columns:
+        self._layout_cache: Dict[str, List[Tuple[tuple, float]]] = {}
+        self._layout_cache_hits = 0
+        self._name_registries: Dict[Path, OutputNameRegistry] = {}
+        self.timings = StageTimer()
+        self.resume = resume
+        self.use_page_cache = use_page_cache or resume
+        self._page_cache: Optional[PageResultCache] = None
+        self._pdf_hash: Optional[str] = None
+        self._mapping_hash: Optional[str] = None
+        self._document = None
+        self._mapped_input = None
+        self._text_export_dir: Optional[Path] = None
+        self._report_writer = None
+        self._current_page = _PendingPage()
+        self._pending_pages: Deque[_PendingPage] = deque()
+        self.writer_threads = max(int(writer_threads or 0), 0)
+        self._writer: Optional[AsyncFileWriter] = None
+        self._failed_writes = set()
+        self.ocr = ocr
+        self.ocr_dpi = ocr_dpi
+        self.ocr_language = ocr_language
+        self.ocr_workers = ocr_workers
+        self._ocr_texts: Dict[int, str] = {}
+        self.fuzzy_distance = max(int(fuzzy_distance or 0), 0)
+        self._matcher: Optional[MatcherEngine] = matcher
+        self.dedupe = dedupe
+        self._deduplicator: Optional[SupportDeduplicator] = None
+        self.archive_format = (archive_format or "").lower() or None
+        if self.archive_format not in (None,) + ARCHIVE_FORMATS:
+            self.archive_format = None
+        self._archive: Optional[SupportArchive] = None
+        self.archive_path: Optional[Path] = None
+
+        if mapping is not None:
+            self.search_to_rename_map = mapping
+        elif self.initial_excel_path and self.mapping_columns:
             try:
                 self.search_to_rename_map = self.load_excel_mapping(
                     self.initial_excel_path,
@@ -96,94 +348,7 @@ class PDFProcessor:
     def load_excel_mapping(
         self, excel_path: Path, search_col_name: str, rename_col_name: str
     ) -> Dict[str, str]:
-        if load_workbook is None:
-            raise RuntimeError(
-                "openpyxl no está instalado. No se puede leer el Excel inicial."
-            )
-        if not excel_path.exists():
-            raise FileNotFoundError(f"Excel no encontrado: {excel_path}")
-
-        wb = load_workbook(filename=str(excel_path), read_only=True, data_only=True)
-        ws = wb.active
-
-        headers: List[str] = []
-        for cell in ws[1]:
-            cell_value = cell.value
-            if cell_value is not None:
-                headers.append(str(cell_value).strip())
-            else:
-                headers.append("")
-
-        self.logger.debug(f"Headers encontrados: {headers}")
-
-        norm_headers = {
-            h.strip().casefold(): i for i, h in enumerate(headers) if h.strip()
-        }
-        s_key = (search_col_name or "").strip().casefold()
-        r_key = (rename_col_name or "").strip().casefold()
-
-        if s_key not in norm_headers or r_key not in norm_headers:
-            wb.close()
-            available_headers = [h for h in headers if h.strip()]
-            raise ValueError(
-                "No se encontraron las columnas seleccionadas en el Excel. "
-                f"Disponibles: {', '.join([repr(h) for h in available_headers])}"
-            )
-
-        search_idx = norm_headers[s_key]
-        rename_idx = norm_headers[r_key]
-
-        mapping: Dict[str, str] = {}
-        processed_rows = 0
-        empty_rows = 0
-
-        for row_num, row in enumerate(ws.iter_rows(min_row=2), start=2):
-            processed_rows += 1
-
-            s_val = row[search_idx].value if len(row) > search_idx else None
-            r_val = row[rename_idx].value if len(row) > rename_idx else None
-
-            if s_val is None and r_val is None:
-                empty_rows += 1
-                continue
-
-            if s_val is None or r_val is None:
-                self.logger.warning(
-                    f"Fila {row_num}: Valor faltante - Búsqueda: '{s_val}', Renombrado: '{r_val}'"
-                )
-                continue
-
-            s = str(s_val).strip()
-            r = str(r_val).strip()
-
-            if not s or not r:
-                self.logger.warning(
-                    f"Fila {row_num}: Valores vacíos después de normalizar - Búsqueda: '{s}', Renombrado: '{r}'"
-                )
-                continue
-
-            if s in mapping:
-                self.logger.warning(
-                    f"Fila {row_num}: Valor de búsqueda duplicado '{s}' - manteniendo primer valor '{mapping[s]}'"
-                )
-                continue
-
-            mapping[s] = r
-            self.logger.debug(f"Fila {row_num}: Mapeado '{s}' -> '{r}'")
-
-        wb.close()
-
-        self.logger.info(
-            f"Procesadas {processed_rows} filas, {empty_rows} vacías, {len(mapping)} mapeos válidos"
-        )
-
-        if not mapping:
-            raise ValueError(
-                "No se pudo crear ningún mapeo válido desde el Excel. "
-                "Verifique que las columnas tengan datos."
-            )
-
-        return mapping
+        return load_excel_mapping(excel_path, search_col_name, rename_col_name)
 
     def _sanitize_filename(self, name: str) -> str:
         """Sanitiza un nombre para que sea válido como nombre de archivo"""
@@ -196,35 +361,53 @@ class PDFProcessor:
 
     def _unique_path(self, base_dir: Path, filename: str) -> Path:
         """Genera una ruta única en el directorio base"""
-        path = base_dir / filename
-        if not path.exists():
-            return path
-
-        name_part = path.stem
-        extension = path.suffix
-        counter = 1
-
-        while True:
-            new_name = f"{name_part}_{counter}{extension}"
-            new_path = base_dir / new_name
-            if not new_path.exists():
-                return new_path
-            counter += 1
+        registry = self._name_registries.get(base_dir)
+        if registry is None:
+            registry = OutputNameRegistry(base_dir)
+            self._name_registries[base_dir] = registry
+        return registry.allocate(filename)
+
+    def _unique_archive_path(self, filename: str) -> Path:
+        """Nombre único de una entrada dentro del zip o tar activo"""
+        archive_path = self._archive.path
+        registry = self._name_registries.get(archive_path)
+        if registry is None:
+            registry = OutputNameRegistry(archive_path)
+            self._name_registries[archive_path] = registry
+        return registry.allocate(filename, reserve=False)
+
+    def _discard_path(self, path: Path):
+        """Borra un soporte anterior para poder reescribirlo con el mismo nombre"""
+        registry = self._name_registries.get(path.parent)
+        if registry is None:
+            registry = OutputNameRegistry(path.parent)
+            self._name_registries[path.parent] = registry
+        registry.discard(path)
+
+    def _release_path(self, path: Path):
+        """Libera una ruta reservada cuyo archivo no se pudo escribir"""
+        registry = self._name_registries.get(path.parent)
+        if registry is not None:
+            registry.release(path)
 
     def _normalize_text_for_search(self, text: str) -> str:
-        if not text:
-            return ""
-        normalized = " ".join(text.split())
-        normalized = normalized.lower()
-        normalized = re.sub(r"[^\w\s]", " ", normalized)
-        normalized = " ".join(normalized.split())
-        return normalized
-
-    def _extract_value_after_header(self, text: str, header_name: str) -> Optional[str]:
+        return normalize_search_text(text)
+
+    def _extract_value_after_header(
+        self, text: str, header_name: str, layout: Optional[WordLayout] = None
+    ) -> Optional[str]:
         """Extrae el valor que viene después del nombre del header en el texto"""
         if not text or not header_name:
             return None
 
+        if layout is not None:
+            value = layout.value_after((header_name,), r"[A-Za-z0-9][\w\-]*")
+            if value:
+                self.logger.debug(
+                    f"Valor extraído por posición junto a '{header_name}': '{value}'"
+                )
+                return value
+
         pattern = re.escape(header_name)
         match = re.search(pattern, text, re.IGNORECASE)
 
@@ -258,7 +441,9 @@ class PDFProcessor:
 
         return None
 
-    def _find_rename_in_text(self, text: str) -> Optional[str]:
+    def _find_rename_in_text(
+        self, text: str, layout: Optional[WordLayout] = None
+    ) -> Optional[str]:
         if not self.search_to_rename_map:
             self.logger.debug("No hay mapeo cargado desde Excel")
             return None
@@ -272,19 +457,13 @@ class PDFProcessor:
         )
 
         extracted_values = []
+        matcher = self._get_matcher()
 
         self.logger.debug("=== MÉTODO 1: Búsqueda directa de valores del Excel ===")
-        for i, key in enumerate(
-            sorted(
-                self.search_to_rename_map.keys(),
-                key=lambda k: len(str(k)),
-                reverse=True,
-            )[:10]
-        ):
+        for key, normalized_key in matcher.longest_keys:
             if not key:
                 continue
 
-            normalized_key = self._normalize_text_for_search(str(key))
             self.logger.debug(f"  Buscando: '{key}' (normalizado: '{normalized_key}')")
 
             if not normalized_key:
@@ -307,7 +486,9 @@ class PDFProcessor:
                         f"Buscando header de columna '{col_name}' en el texto del PDF"
                     )
 
-                    extracted_value = self._extract_value_after_header(text, col_name)
+                    extracted_value = self._extract_value_after_header(
+                        text, col_name, layout
+                    )
 
                     if extracted_value:
                         extracted_values.append(extracted_value)
@@ -316,9 +497,8 @@ class PDFProcessor:
                         )
 
                         is_in_search_keys = extracted_value in self.search_to_rename_map
-                        is_in_rename_values = (
-                            extracted_value in self.search_to_rename_map.values()
-                        )
+                        source_key = matcher.key_for_rename.get(extracted_value)
+                        is_in_rename_values = source_key is not None
 
                         self.logger.info(
                             f"🔍 DEBUG VERIFICACIÓN: "
@@ -335,58 +515,39 @@ class PDFProcessor:
                             )
 
                         if is_in_rename_values:
-                            for (
-                                search_key,
-                                rename_val,
-                            ) in self.search_to_rename_map.items():
-                                if rename_val == extracted_value:
-                                    self.logger.info(
-                                        f"🔍 Si está en valores Excel, viene de la clave: '{search_key}'"
-                                    )
-                                    break
-
-                        for (
-                            excel_key,
-                            rename_value,
-                        ) in self.search_to_rename_map.items():
-                            excel_key_str = str(excel_key).strip()
-                            if excel_key_str.lower() == extracted_value.lower():
-                                self.logger.info(
-                                    f"✅ COINCIDENCIA POR HEADER ENCONTRADA: '{extracted_value}' -> '{rename_value}'"
-                                )
-                                return rename_value
+                            self.logger.info(
+                                f"🔍 Si está en valores Excel, viene de la clave: '{source_key}'"
+                            )
+
+                        exact_match = matcher.match_exact(extracted_value)
+                        if exact_match is not None:
+                            self.logger.info(
+                                f"✅ COINCIDENCIA POR HEADER ENCONTRADA: '{extracted_value}' -> '{exact_match.rename_value}'"
+                            )
+                            return exact_match.rename_value
 
                         self.logger.debug(
                             "No se encontró coincidencia exacta, buscando coincidencia parcial..."
                         )
-                        for (
-                            excel_key,
-                            rename_value,
-                        ) in self.search_to_rename_map.items():
-                            excel_key_str = str(excel_key).strip()
-                            if (
-                                extracted_value.lower() in excel_key_str.lower()
-                                or excel_key_str.lower() in extracted_value.lower()
-                            ):
-                                self.logger.info(
-                                    f"✅ COINCIDENCIA PARCIAL POR HEADER ENCONTRADA: '{extracted_value}' ≈ '{excel_key}' -> '{rename_value}'"
-                                )
-                                return rename_value
+                        partial_match = matcher.match_partial(extracted_value)
+                        if partial_match is not None:
+                            self.logger.info(
+                                f"✅ COINCIDENCIA PARCIAL POR HEADER ENCONTRADA: '{extracted_value}' ≈ '{partial_match.key}' -> '{partial_match.rename_value}'"
+                            )
+                            return partial_match.rename_value
 
-        self.logger.debug("=== MÉTODO 3: Búsqueda flexible con palabras clave ===")
-        for excel_key, rename_value in list(self.search_to_rename_map.items())[:5]:
-            excel_key_normalized = self._normalize_text_for_search(str(excel_key))
-            if not excel_key_normalized:
-                continue
+                        fuzzy_match = self._match_fuzzy(matcher, extracted_value)
+                        if fuzzy_match is not None:
+                            return fuzzy_match.rename_value
 
-            key_words = excel_key_normalized.split()
-            if len(key_words) >= 2:
-                for word in key_words:
-                    if len(word) >= 4 and word in normalized_pdf_text:
-                        self.logger.info(
-                            f"✅ COINCIDENCIA FLEXIBLE ENCONTRADA: palabra '{word}' de '{excel_key}' -> '{rename_value}'"
-                        )
-                        return rename_value
+        self.logger.debug("=== MÉTODO 3: Búsqueda flexible con palabras clave ===")
+        token_match = matcher.match_tokens(normalized_pdf_text)
+        if token_match is not None:
+            self.logger.info(
+                f"✅ COINCIDENCIA FLEXIBLE ENCONTRADA: '{token_match.key}' "
+                f"(puntuación {token_match.score:.2f}) -> '{token_match.rename_value}'"
+            )
+            return token_match.rename_value
 
         if extracted_values:
             fallback_value = extracted_values[0]
@@ -399,26 +560,65 @@ class PDFProcessor:
         self.logger.warning("❌ No se encontró ninguna coincidencia en el texto")
         return None
 
+    def _get_matcher(self) -> MatcherEngine:
+        """Motor de coincidencias del mapeo actual, construido una sola vez"""
+        matcher = self._matcher
+        if (
+            matcher is None
+            or matcher.mapping is not self.search_to_rename_map
+            or matcher.fuzzy_distance != self.fuzzy_distance
+        ):
+            self._matcher = MatcherEngine(
+                self.search_to_rename_map, self.fuzzy_distance
+            )
+        return self._matcher
+
+    def _match_fuzzy(self, matcher: MatcherEngine, value: str):
+        """Busca la clave más parecida; descarta empates entre varias claves"""
+        candidates = matcher.match_fuzzy(value)
+        if not candidates:
+            return None
+
+        self.logger.debug(
+            "Candidatas aproximadas: "
+            + ", ".join(f"'{c.key}' ({c.score:.2f})" for c in candidates)
+        )
+        best = candidates[0]
+        if len(candidates) > 1 and candidates[1].distance == best.distance:
+            self.logger.warning(
+                f"⚠️ Coincidencia aproximada ambigua para '{value}': "
+                f"'{best.key}' y '{candidates[1].key}' a distancia {best.distance}"
+            )
+            return None
+
+        self.logger.info(
+            f"✅ COINCIDENCIA APROXIMADA ENCONTRADA: '{value}' ≈ '{best.key}' "
+            f"(distancia {best.distance}, puntuación {best.score:.2f}) -> '{best.rename_value}'"
+        )
+        return best
+
     def _save_debug_text(self, text: str, page_num: int, support_num: int = 1):
         """Guarda el texto extraído para debugging manual"""
         debug_dir = self.output_dir / "debug_texts"
-        debug_dir.mkdir(exist_ok=True)
+        if self._archive is None:
+            debug_dir.mkdir(exist_ok=True)
 
         debug_file = debug_dir / f"page_{page_num}_support_{support_num}_debug.txt"
 
         try:
-            with open(debug_file, "w", encoding="utf-8") as f:
-                f.write("=== TEXTO ORIGINAL ===\n")
-                f.write(text)
-                f.write("\n\n=== TEXTO NORMALIZADO ===\n")
-                f.write(self._normalize_text_for_search(text))
-                f.write("\n\n=== VALORES DEL EXCEL PARA COMPARAR ===\n")
-                for i, (search_key, rename_val) in enumerate(
-                    list(self.search_to_rename_map.items())[:10], 1
-                ):
-                    f.write(
-                        f"{i}. Buscar: '{search_key}' -> Renombrar: '{rename_val}'\n"
-                    )
+            parts = [
+                "=== TEXTO ORIGINAL ===\n",
+                text,
+                "\n\n=== TEXTO NORMALIZADO ===\n",
+                self._normalize_text_for_search(text),
+                "\n\n=== VALORES DEL EXCEL PARA COMPARAR ===\n",
+            ]
+            for i, (search_key, rename_val) in enumerate(
+                islice(self.search_to_rename_map.items(), 10), 1
+            ):
+                parts.append(f"{i}. Buscar: '{search_key}' -> Renombrar: '{rename_val}'\n")
+
+            self._write_file(debug_file, "".join(parts).encode("utf-8"))
 
             self.logger.debug(f"Texto de debug guardado en: {debug_file}")
         except Exception as e:
@@ -430,6 +630,78 @@ class PDFProcessor:
 
     def create_output_directory(self):
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+
+    def _page_numbers(self, total_pages: int) -> range:
+        """Índices de las páginas a procesar según el rango pedido (1-based)"""
+        if not self.pages:
+            return range(total_pages)
+        first, last = self.pages
+        return range(max(first, 1) - 1, min(last, total_pages))
+
+    def open_document(self):
+        """Devuelve el documento de entrada compartido, abriéndolo una sola vez"""
+        if self._document is None:
+            self.validate_input()
+            self._document = self._open_mapped_document()
+        return self._document
+
+    def close_document(self):
+        """Cierra el documento compartido y libera el mapeo en memoria del archivo"""
+        if self._document is not None:
+            self._document.close()
+            self._document = None
+        if self._mapped_input is not None:
+            handle, mapped, view = self._mapped_input
+            view.release()
+            mapped.close()
+            handle.close()
+            self._mapped_input = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close_document()
+
+    def _open_mapped_document(self):
+        """Abre el PDF de entrada desde un mmap del archivo, sin copiarlo en memoria"""
+        import fitz
+
+        handle = open(self.input_pdf_path, "rb")
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            handle.close()
+            return fitz.open(str(self.input_pdf_path))
+
+        view = memoryview(mapped)
+        try:
+            document = fitz.open(stream=view, filetype="pdf")
+        except TypeError:
+            # Versiones de PyMuPDF que no aceptan memoryview como stream
+            view.release()
+            mapped.close()
+            handle.close()
+            return fitz.open(str(self.input_pdf_path))
+
+        self._mapped_input = (handle, mapped, view)
+        return document
+
+    @contextmanager
+    def _document_session(self):
+        """Usa el documento compartido y lo cierra al salir solo si lo abrió aquí"""
+        owns_document = self._document is None
+        try:
+            yield self.open_document()
+        finally:
+            if owns_document:
+                self.close_document()
+
+    def _input_sha256(self) -> str:
+        if self._mapped_input is not None:
+            return hashlib.sha256(self._mapped_input[2]).hexdigest()
+        return file_sha256(self.input_pdf_path)
 
     def extract_metadata(self, pdf_document):
         """Extrae metadatos básicos del PDF"""
@@ -449,38 +721,32 @@ class PDFProcessor:
         """
         Detección avanzada de soportes de pago usando análisis de texto y elementos visuales
         """
-        text = page.get_text()
+        import fitz
 
-        payment_indicators = [
-            "comprobante",
-            "soporte",
-            "pago",
-            "transferencia",
-            "payment",
-            "receipt",
-            "voucher",
-            "transaction",
-            "reference",
-            "número de referencia",
-            "transaction reference number",
-            "numero de transaccion",
-            "codigo de transaccion",
-            "ref:",
-            "reference:",
-            "nro:",
-            "numero:",
-            "fecha:",
-            "date:",
-            "valor:",
-            "amount:",
-            "monto:",
-            "beneficiario:",
-            "destinatario:",
-            "cuenta:",
-            "account:",
-            "banco:",
-            "bank:",
-        ]
+        blocks = page.get_text("blocks")
+        fingerprint = self._layout_fingerprint(page, blocks)
+        cached_regions = self._layout_cache.get(fingerprint)
+
+        if cached_regions is not None:
+            self._layout_cache_hits += 1
+            self.logger.debug(
+                f"Página {page_num + 1}: Plantilla conocida, reutilizando regiones"
+            )
+            regions = []
+            for rect, confidence in cached_regions:
+                region_text = self._text_from_blocks(blocks, rect)
+                regions.append(
+                    {
+                        "rect": fitz.Rect(rect),
+                        "confidence": confidence,
+                        "region_text": region_text[:200] + "..."
+                        if len(region_text) > 200
+                        else region_text,
+                    }
+                )
+            return regions
+
+        text = page.get_text()
 
         support_regions = []
         page_height = page.rect.height
@@ -496,7 +762,7 @@ class PDFProcessor:
             region_text = page.get_textbox(region_rect).lower()
 
             score = 0
-            for indicator in payment_indicators:
+            for indicator in PAYMENT_INDICATORS:
                 if indicator in region_text:
                     score += 1
 
@@ -504,7 +770,7 @@ class PDFProcessor:
                 support_regions.append(
                     {
                         "rect": region_rect,
-                        "confidence": min(score / len(payment_indicators), 1.0),
+                        "confidence": min(score / len(PAYMENT_INDICATORS), 1.0),
                         "region_text": region_text[:200] + "..."
                         if len(region_text) > 200
                         else region_text,
@@ -520,8 +786,50 @@ class PDFProcessor:
                 }
             )
 
+        if len(self._layout_cache) < LAYOUT_CACHE_MAX:
+            self._layout_cache[fingerprint] = [
+                (tuple(region["rect"]), region["confidence"])
+                for region in support_regions
+            ]
+
         return support_regions
 
+    def _layout_fingerprint(self, page, blocks) -> str:
+        """Calcula una huella de la plantilla de la página a partir de sus bloques"""
+        features = [round(page.rect.width), round(page.rect.height), len(blocks)]
+
+        for block in blocks:
+            x0, y0 = block[0], block[1]
+            block_text = str(block[4]).strip().lower()
+            label = block_text.split(":", 1)[0][:40] if ":" in block_text else ""
+            # Los indicadores deciden las regiones, así que entran en la huella
+            # aunque no vayan seguidos de ':'
+            indicators = tuple(
+                i
+                for i, indicator in enumerate(PAYMENT_INDICATORS)
+                if indicator in block_text
+            )
+            features.append(
+                (
+                    int(x0 // LAYOUT_GRID),
+                    int(y0 // LAYOUT_GRID),
+                    block[6],
+                    label,
+                    indicators,
+                )
+            )
+
+        return hashlib.sha1(repr(features).encode("utf-8")).hexdigest()
+
+    def _text_from_blocks(self, blocks, rect) -> str:
+        """Reconstruye el texto de una región a partir de los bloques de la página"""
+        import fitz
+
+        region = fitz.Rect(rect)
+        return "".join(
+            str(block[4]) for block in blocks if region.intersects(fitz.Rect(block[:4]))
+        ).lower()
+
     def detect_payment_supports(self, page, page_num=0, total_pages=0):
         """Detecta regiones que parecen ser soportes de pago en una página"""
         try:
@@ -554,124 +862,581 @@ class PDFProcessor:
         """Separa los soportes individuales de una página del PDF"""
         page = pdf_document[page_num]
 
-        support_regions = self.detect_payment_supports(
-            page, page_num, pdf_document.page_count
-        )
+        # Los soportes de una ejecución anterior quedaron dentro de otro archivo
+        # comprimido, así que con --archive se regeneran todas las páginas
+        if self.resume and self._page_cache is not None and self._archive is None:
+            cached_entry = self._page_cache.get(self._pdf_hash, page_num)
+            # Una página escaneada que quedó vacía en una ejecución sin OCR se
+            # procesa de nuevo cuando ahora sí hay texto reconocido
+            if (
+                cached_entry is not None
+                and not cached_entry.get("supports")
+                and page_num in self._ocr_texts
+            ):
+                cached_entry = None
+            if cached_entry is not None:
+                if self._text_export_dir is not None:
+                    with self.timings.stage("extraccion_texto"):
+                        page_text = page.get_text()
+                    self._export_page_text(page_num, page_text)
+                return self._resume_cached_page(pdf_document, page_num, cached_entry)
+
+        with self.timings.stage("deteccion"):
+            support_regions = self.detect_payment_supports(
+                page, page_num, pdf_document.page_count
+            )
 
-        created_files = []
+        supports = []
+        page_text = None
 
         if len(support_regions) <= 1:
-            page_text = page.get_text()
+            with self.timings.stage("extraccion_texto"):
+                page_text = page.get_text()
+
+            if not page_text.strip() and page_num in self._ocr_texts:
+                page_text = self._ocr_texts[page_num]
+                self.logger.info(f"Página {page_num + 1}: Usando texto obtenido por OCR")
+
+            if self._text_export_dir is not None:
+                self._export_page_text(page_num, page_text)
 
             if not page_text.strip():
                 self.logger.warning(f"Página {page_num + 1}: Página vacía, omitiendo")
-                return created_files
+                self._store_page_result(page_num, [], [])
+                return []
 
             self.logger.info(f"Página {page_num + 1}: Procesando como soporte único")
 
-            self._save_debug_text(page_text, page_num + 1, 1)
+            confidence = (
+                support_regions[0].get("confidence", 0.1) if support_regions else 0.1
+            )
+            supports.append((1, None, confidence, page_text))
+
+        else:
+            self.logger.info(
+                f"Página {page_num + 1}: Detectados {len(support_regions)} soportes"
+            )
 
-            rename_value = self._find_rename_in_text(page_text)
+            if self._text_export_dir is not None:
+                with self.timings.stage("extraccion_texto"):
+                    page_text = page.get_text()
+                self._export_page_text(page_num, page_text)
 
-            if rename_value:
-                output_filename = f"{rename_value}.pdf"
-                self.logger.info(
-                    f"Página {page_num + 1}: Renombrando a '{output_filename}'"
+            for support_idx, region in enumerate(support_regions, 1):
+                clip_rect = region["rect"]
+
+                with self.timings.stage("extraccion_texto"):
+                    clip_text = page.get_text(clip=clip_rect)
+
+                if clip_text.strip():
+                    supports.append(
+                        (
+                            support_idx,
+                            clip_rect,
+                            region.get("confidence", 0.5),
+                            clip_text,
+                        )
+                    )
+                else:
+                    self.logger.warning(
+                        f"Soporte {support_idx}: Región sin texto, omitiendo"
+                    )
+
+        created_files = []
+        page_words = self._page_words(page) if supports else []
+
+        for support_idx, clip_rect, confidence, text in supports:
+            try:
+                with self.timings.stage("debug"):
+                    self._save_debug_text(text, page_num + 1, support_idx)
+
+                layout = WordLayout(page_words, clip_rect)
+
+                original = self._find_duplicate(page_num, clip_rect, text)
+                if original is not None:
+                    file_info = self._duplicate_support(
+                        original, page_num, support_idx, confidence
+                    )
+                    created_files.append(file_info)
+                    self._collect_report_row(file_info, text, layout)
+                    continue
+
+                with self.timings.stage("busqueda"):
+                    rename_value = self._find_rename_in_text(text, layout)
+
+                output_path = self._write_support(
+                    pdf_document, page_num, support_idx, clip_rect, rename_value
                 )
-            else:
-                output_filename = f"soporte_pagina_{page_num + 1}.pdf"
-                self.logger.warning(
-                    f"Página {page_num + 1}: No se encontró valor para renombrar, usando '{output_filename}'"
+
+                file_info = SupportFile(
+                    str(output_path), page_num + 1, support_idx, rename_value, confidence
                 )
+                created_files.append(file_info)
+                self._register_support(page_num, clip_rect, text, file_info)
+                self._collect_report_row(file_info, text, layout)
 
-            output_path = self._unique_path(self.output_dir, output_filename)
+                self.logger.info(f"✅ Creado: {output_path.name}")
 
-            new_doc = fitz.open()
-            new_doc.insert_pdf(pdf_document, from_page=page_num, to_page=page_num)
-            new_doc.save(str(output_path))
-            new_doc.close()
+            except Exception as e:
+                if clip_rect is None:
+                    raise
+                self.logger.error(f"Error procesando soporte {support_idx}: {e}")
+
+        self._store_page_result(page_num, supports, created_files)
+
+        return created_files
+
+    def _find_duplicate(self, page_num, clip_rect, text):
+        """Soporte ya escrito con el mismo contenido, si se pidió deduplicar"""
+        if self._deduplicator is None:
+            return None
+        with self.timings.stage("deduplicacion"):
+            return self._deduplicator.find(page_num, clip_rect, text)
+
+    def _register_support(self, page_num, clip_rect, text, file_info):
+        if self._deduplicator is not None:
+            self._deduplicator.add(page_num, clip_rect, text, file_info)
 
-            created_files.append(
+    def _duplicate_support(self, original, page_num, support_idx, confidence):
+        """Registro de un soporte repetido que reutiliza el archivo del original"""
+        duplicate_of = f"página {original.page}, soporte {original.support}"
+        self.logger.info(
+            f"♊ Página {page_num + 1}, soporte {support_idx}: duplicado de "
+            f"{duplicate_of} ({Path(original.file).name}), no se escribe"
+        )
+        if self._archive is not None:
+            self._archive.add_reference(
+                Path(original.file).name,
                 {
-                    "file": str(output_path),
-                    "page": page_num + 1,
-                    "support": 1,
-                    "rename_value": rename_value,
-                    "confidence": support_regions[0].get("confidence", 0.1)
-                    if support_regions
-                    else 0.1,
-                }
+                    "pagina": page_num + 1,
+                    "soporte": support_idx,
+                    "valor_renombrado": original.rename_value,
+                    "duplicado_de": duplicate_of,
+                },
             )
+        return SupportFile(
+            original.file,
+            page_num + 1,
+            support_idx,
+            original.rename_value,
+            confidence,
+            duplicate_of,
+        )
+
+    def _page_words(self, page):
+        """Palabras con coordenadas de la página, para la extracción por posición"""
+        with self.timings.stage("extraccion_texto"):
+            return page.get_text("words")
+
+    def _collect_report_row(self, file_info, text, layout=None):
+        """Prepara la fila del informe detallado durante el procesamiento combinado.
+
+        La fila se añade al informe cuando terminan las escrituras de su página,
+        para dejar fuera los archivos que no se pudieron escribir.
+        """
+        if self._report_writer is None:
+            return
+        with self.timings.stage("informes"):
+            payment_info = self._extract_payment_info_from_text(text, layout)
+            self._current_page.rows.append(
+                (file_info.file, self._build_report_row(file_info, payment_info))
+            )
+
+    def _export_page_text(self, page_num, text):
+        """Guarda el texto de una página en la carpeta textos_extraidos"""
+        if not text.strip():
+            return
+
+        text_file = self._text_export_dir / f"pagina_{page_num + 1}_texto.txt"
+        with self.timings.stage("exportacion_texto"):
+            content = f"=== TEXTO DE PÁGINA {page_num + 1} ===\n\n{text}"
+            self._write_file(text_file, content.encode("utf-8"))
+
+        self.logger.debug(f"Texto extraído de página {page_num + 1}: {text_file}")
+
+    def _write_file(self, path: Path, data: bytes, on_error=None) -> Optional[Future]:
+        """Escribe un archivo, en segundo plano si hay un escritor activo.
+
+        Devuelve el Future de la escritura en segundo plano, o None si el
+        archivo ya quedó escrito.
+        """
+        if self._archive is not None and path.is_relative_to(self.output_dir):
+            with self.timings.stage("escritura_disco"):
+                self._archive.add(path.relative_to(self.output_dir).as_posix(), data)
+            return None
+
+        if self._writer is not None:
+            return self._writer.write_bytes(path, data, on_error=on_error)
+
+        with self.timings.stage("escritura_disco"):
+            with open(path, "wb") as f:
+                f.write(data)
+
+    def _on_output_error(self, path: Path, error: Exception):
+        self.logger.error(f"Error escribiendo {path.name}: {error}")
+        self._failed_writes.add(str(path))
+        self._release_path(path)
+
+    @contextmanager
+    def _writer_session(self):
+        """Activa el escritor en segundo plano y espera sus escrituras al salir"""
+        if self._writer is not None or self.writer_threads <= 0:
+            yield
+            return
 
-            self.logger.info(f"✅ Creado: {output_path.name}")
+        self._writer = AsyncFileWriter(
+            max_workers=self.writer_threads,
+            max_pending=self.writer_threads * 8,
+            on_written=lambda seconds: self.timings.add("escritura_disco", seconds),
+        )
+        try:
+            yield
+        finally:
+            writer, self._writer = self._writer, None
+            with self.timings.stage("espera_escritura"):
+                errors = writer.close()
+            if errors:
+                self.logger.error(f"❌ {len(errors)} archivo(s) no se pudieron escribir")
+
+    @contextmanager
+    def _archive_session(self):
+        """Agrupa las salidas de la separación en un único zip o tar"""
+        if self._archive is not None or self.archive_format is None:
+            yield
+            return
+
+        archive_path = self._unique_path(
+            self.output_dir, f"soportes.{self.archive_format}"
+        )
+        self._archive = SupportArchive(archive_path, self.archive_format)
+        self.archive_path = archive_path
+        self.logger.info(f"🗜️ Soportes agrupados en: {archive_path.name}")
+        try:
+            yield
+        finally:
+            archive, self._archive = self._archive, None
+            with self.timings.stage("escritura_disco"):
+                archive.close()
+
+    def _write_support(
+        self, pdf_document, page_num, support_idx, clip_rect, rename_value
+    ) -> Path:
+        """Genera el PDF de un soporte (página completa si clip_rect es None)"""
+        import fitz
+
+        label = (
+            f"Página {page_num + 1}" if clip_rect is None else f"Soporte {support_idx}"
+        )
 
+        if rename_value:
+            output_filename = f"{rename_value}.pdf"
+            self.logger.info(f"{label}: Renombrando a '{output_filename}'")
         else:
-            self.logger.info(
-                f"Página {page_num + 1}: Detectados {len(support_regions)} soportes"
+            if clip_rect is None:
+                output_filename = f"soporte_pagina_{page_num + 1}.pdf"
+            else:
+                output_filename = (
+                    f"soporte_pagina_{page_num + 1}_parte_{support_idx}.pdf"
+                )
+            self.logger.warning(
+                f"{label}: No se encontró valor para renombrar, usando '{output_filename}'"
             )
 
-            for support_idx, region in enumerate(support_regions, 1):
-                try:
-                    clip_rect = region["rect"]
+        if self._archive is not None:
+            output_path = self._unique_archive_path(output_filename)
+        else:
+            output_path = self._unique_path(self.output_dir, output_filename)
 
+        new_doc = None
+        try:
+            with self.timings.stage("guardado_salida"):
+                if clip_rect is None:
                     new_doc = fitz.open()
-                    new_page = new_doc.new_page(
-                        width=clip_rect.width, height=clip_rect.height
+                    new_doc.insert_pdf(
+                        pdf_document, from_page=page_num, to_page=page_num
+                    )
+                    data = new_doc.tobytes()
+                else:
+                    new_doc = self._build_clipped_support(
+                        pdf_document, page_num, clip_rect
+                    )
+                    if self.clip_mode == "crop":
+                        data = new_doc.tobytes(garbage=3, deflate=True)
+                    else:
+                        data = new_doc.tobytes()
+                if self._archive is not None:
+                    with self.timings.stage("escritura_disco"):
+                        self._archive.add(
+                            output_path.name,
+                            data,
+                            {
+                                "pagina": page_num + 1,
+                                "soporte": support_idx,
+                                "valor_renombrado": rename_value,
+                            },
+                        )
+                else:
+                    write = self._write_file(
+                        output_path, data, on_error=self._on_output_error
                     )
+                    if write is not None:
+                        self._current_page.writes.append(write)
+        except Exception:
+            self._release_path(output_path)
+            raise
+        finally:
+            if new_doc is not None:
+                new_doc.close()
+
+        return output_path
+
+    def _store_page_result(self, page_num, supports, created_files):
+        """Prepara el resultado de una página para la caché persistente.
+
+        Se guarda cuando terminan sus escrituras (ver _commit_page), para que una
+        ejecución interrumpida no dé por buenos archivos a medio escribir.
+        """
+        if self._page_cache is None:
+            return
+
+        files_by_support = {info.support: info for info in created_files}
+        entry = {
+            "clip_mode": self.clip_mode,
+            "supports": [
+                {
+                    "support": support_idx,
+                    "rect": list(clip_rect) if clip_rect is not None else None,
+                    "confidence": confidence,
+                    "text": text,
+                    "rename_value": files_by_support[support_idx].rename_value,
+                    "file": files_by_support[support_idx].file,
+                    "duplicate_of": files_by_support[support_idx].duplicate_of,
+                }
+                for support_idx, clip_rect, confidence, text in supports
+                if support_idx in files_by_support
+            ],
+        }
+        self._current_page.cache_entry = (page_num, entry)
+
+    def _end_page(self):
+        """Pone en cola el resultado de la página actual y confirma las ya escritas"""
+        self._pending_pages.append(self._current_page)
+        self._current_page = _PendingPage()
+        self._drain_pages(block=False)
+
+    def _drain_pages(self, block: bool):
+        """Confirma, en orden, las páginas cuyas escrituras ya terminaron.
+
+        Con block espera a las escrituras pendientes y confirma todas las páginas.
+        """
+        while self._pending_pages:
+            pending = self._pending_pages[0]
+            if block:
+                with self.timings.stage("espera_escritura"):
+                    wait(pending.writes)
+            elif not all(write.done() for write in pending.writes):
+                return
+            self._commit_page(self._pending_pages.popleft())
+
+    def _commit_page(self, pending: _PendingPage):
+        """Añade al informe y a la caché una página con sus escrituras terminadas"""
+        if self._report_writer is not None and pending.rows:
+            with self.timings.stage("informes"):
+                for file, row in pending.rows:
+                    if file not in self._failed_writes:
+                        self._report_writer.append(row)
+
+        if self._page_cache is None or pending.cache_entry is None:
+            return
+        # Los soportes que no se pudieron escribir se regeneran al reanudar
+        page_num, entry = pending.cache_entry
+        try:
+            self._page_cache.put(self._pdf_hash, page_num, self._mapping_hash, entry)
+        except Exception as e:
+            self.logger.warning(
+                f"No se pudo guardar la página {page_num + 1} en la caché: {e}"
+            )
+
+    @staticmethod
+    def _is_written(path: Path) -> bool:
+        """El archivo existe y tiene contenido (no es solo el nombre reservado)"""
+        try:
+            return path.stat().st_size > 0
+        except OSError:
+            return False
+
+    def _resume_cached_page(self, pdf_document, page_num, entry):
+        """Reutiliza el resultado guardado de una página, regenerando solo lo necesario"""
+        import fitz
+
+        mapping_changed = entry.get("mapping_hash") != self._mapping_hash
+        clip_mode_changed = entry.get("clip_mode") != self.clip_mode
+        created_files = []
+        regenerated = 0
+        page_words = None
+        if mapping_changed or self._report_writer is not None:
+            page_words = self._page_words(pdf_document[page_num])
+
+        for support in entry.get("supports", []):
+            support_idx = support["support"]
+            clip_rect = fitz.Rect(support["rect"]) if support["rect"] else None
+            rename_value = support["rename_value"]
+            layout = (
+                WordLayout(page_words, clip_rect) if page_words is not None else None
+            )
+
+            # El archivo de un duplicado pertenece a su original: no se reutiliza
+            # ni se borra como si fuera propio
+            previous_path = (
+                Path(support["file"])
+                if support.get("file") and not support.get("duplicate_of")
+                else None
+            )
 
-                    source_area = fitz.Rect(0, 0, clip_rect.width, clip_rect.height)
-                    new_page.show_pdf_page(
-                        source_area, pdf_document, page_num, clip=clip_rect
+            original = self._find_duplicate(page_num, clip_rect, support["text"])
+            if original is not None:
+                if previous_path is not None and previous_path.exists():
+                    self._discard_path(previous_path)
+                    regenerated += 1
+                file_info = self._duplicate_support(
+                    original, page_num, support_idx, support["confidence"]
+                )
+                created_files.append(file_info)
+                self._collect_report_row(file_info, support["text"], layout)
+                continue
+
+            if mapping_changed:
+                with self.timings.stage("busqueda"):
+                    rename_value = self._find_rename_in_text(support["text"], layout)
+            reusable = (
+                previous_path is not None
+                and self._is_written(previous_path)
+                and rename_value == support["rename_value"]
+                and (clip_rect is None or not clip_mode_changed)
+            )
+
+            try:
+                if reusable:
+                    output_path = previous_path
+                else:
+                    if previous_path is not None and previous_path.exists():
+                        self._discard_path(previous_path)
+                    output_path = self._write_support(
+                        pdf_document, page_num, support_idx, clip_rect, rename_value
                     )
+                    regenerated += 1
+                    self.logger.info(f"✅ Regenerado: {output_path.name}")
+            except Exception as e:
+                if clip_rect is None:
+                    raise
+                self.logger.error(f"Error procesando soporte {support_idx}: {e}")
+                continue
 
-                    clip_text = new_page.get_text()
+            file_info = SupportFile(
+                str(output_path),
+                page_num + 1,
+                support_idx,
+                rename_value,
+                support["confidence"],
+            )
+            created_files.append(file_info)
+            self._register_support(page_num, clip_rect, support["text"], file_info)
+            self._collect_report_row(file_info, support["text"], layout)
 
-                    if clip_text.strip():
-                        self._save_debug_text(clip_text, page_num + 1, support_idx)
+        self.logger.info(
+            f"♻️ Página {page_num + 1}: reanudada desde caché "
+            f"({regenerated} soporte(s) regenerado(s))"
+        )
 
-                        rename_value = self._find_rename_in_text(clip_text)
+        if regenerated or mapping_changed:
+            supports = [
+                (
+                    support["support"],
+                    fitz.Rect(support["rect"]) if support["rect"] else None,
+                    support["confidence"],
+                    support["text"],
+                )
+                for support in entry.get("supports", [])
+            ]
+            self._store_page_result(page_num, supports, created_files)
 
-                        if rename_value:
-                            output_filename = f"{rename_value}.pdf"
-                            self.logger.info(
-                                f"Soporte {support_idx}: Renombrando a '{output_filename}'"
-                            )
-                        else:
-                            output_filename = (
-                                f"soporte_pagina_{page_num + 1}_parte_{support_idx}.pdf"
-                            )
-                            self.logger.warning(
-                                f"Soporte {support_idx}: No se encontró valor para renombrar, usando '{output_filename}'"
-                            )
+        return created_files
 
-                        output_path = self._unique_path(
-                            self.output_dir, output_filename
-                        )
+    def _build_clipped_support(self, pdf_document, page_num, clip_rect):
+        """Crea un documento con el contenido de la región indicada de la página"""
+        import fitz
 
-                        new_doc.save(str(output_path))
+        new_doc = fitz.open()
 
-                        created_files.append(
-                            {
-                                "file": str(output_path),
-                                "page": page_num + 1,
-                                "support": support_idx,
-                                "rename_value": rename_value,
-                                "confidence": region.get("confidence", 0.5),
-                            }
-                        )
+        if self.clip_mode == "crop":
+            new_doc.insert_pdf(pdf_document, from_page=page_num, to_page=page_num)
+            new_page = new_doc[0]
+            page_rect = new_page.rect
+
+            outside_areas = [
+                fitz.Rect(page_rect.x0, page_rect.y0, page_rect.x1, clip_rect.y0),
+                fitz.Rect(page_rect.x0, clip_rect.y1, page_rect.x1, page_rect.y1),
+                fitz.Rect(page_rect.x0, clip_rect.y0, clip_rect.x0, clip_rect.y1),
+                fitz.Rect(clip_rect.x1, clip_rect.y0, page_rect.x1, clip_rect.y1),
+            ]
+            redacted = False
+            for area in outside_areas:
+                if not area.is_empty:
+                    new_page.add_redact_annot(area)
+                    redacted = True
+            if redacted:
+                new_page.apply_redactions(
+                    images=fitz.PDF_REDACT_IMAGE_NONE,
+                    graphics=fitz.PDF_REDACT_LINE_ART_REMOVE_IF_COVERED,
+                )
 
-                        self.logger.info(f"✅ Creado: {output_path.name}")
-                    else:
-                        self.logger.warning(
-                            f"Soporte {support_idx}: Región sin texto, omitiendo"
-                        )
+            new_page.set_cropbox(clip_rect * new_page.derotation_matrix)
+            return new_doc
 
-                    new_doc.close()
+        new_page = new_doc.new_page(width=clip_rect.width, height=clip_rect.height)
+        source_area = fitz.Rect(0, 0, clip_rect.width, clip_rect.height)
+        new_page.show_pdf_page(source_area, pdf_document, page_num, clip=clip_rect)
+        return new_doc
 
-                except Exception as e:
-                    self.logger.error(f"Error procesando soporte {support_idx}: {e}")
-                    if "new_doc" in locals():
-                        new_doc.close()
+    def process(self, extract_text: bool = False, detailed_info: bool = False):
+        """Procesa el PDF visitando cada página una sola vez.
+
+        La separación de soportes, la exportación de texto y el informe detallado
+        se generan a partir del mismo texto extraído, en lugar de recorrer el PDF
+        y los soportes generados en pasadas separadas.
+        """
+        self.validate_input()
+        self.create_output_directory()
+
+        if extract_text:
+            self._text_export_dir = self.output_dir / "textos_extraidos"
+            if self.archive_format is None:
+                self._text_export_dir.mkdir(exist_ok=True)
+        if detailed_info:
+            try:
+                self._report_writer = self._open_report_writer()
+            except Exception as e:
+                self.logger.error(f"Error creando informe detallado: {e}")
+
+        try:
+            with self._document_session():
+                created_files = self.separate_pages()
+
+                if extract_text:
+                    self.logger.info(
+                        f"📝 Textos extraídos guardados en: {self._text_export_dir}"
+                    )
+
+                if self._report_writer is not None:
+                    report_writer, self._report_writer = self._report_writer, None
+                    with self.timings.stage("informes"):
+                        self._close_report_writer(report_writer)
+                    self.save_timing_report()
+        finally:
+            if self._report_writer is not None:
+                self._report_writer.close()
+            self._text_export_dir = None
+            self._report_writer = None
 
         return created_files
 
@@ -679,78 +1444,243 @@ class PDFProcessor:
         """Separa el PDF en soportes individuales"""
         self.validate_input()
         self.create_output_directory()
+        self.timings.reset()
+
+        with self._document_session() as pdf_document:
+            with self._writer_session(), self._archive_session():
+                created_files = self._separate_document_pages(pdf_document)
+
+            # El resumen se genera cuando ya terminaron las escrituras, sin los
+            # archivos que fallaron
+            if self._failed_writes:
+                created_files = [
+                    info
+                    for info in created_files
+                    if info.file not in self._failed_writes
+                ]
+            self._finish_separation(pdf_document, created_files)
+
+        return created_files
 
-        pdf_document = fitz.open(str(self.input_pdf_path))
+    def _separate_document_pages(self, pdf_document):
         total_pages = pdf_document.page_count
+        page_numbers = self._page_numbers(total_pages)
 
         self.logger.info(f"📄 Procesando PDF: {self.input_pdf_path.name}")
         self.logger.info(f"📊 Total de páginas: {total_pages}")
+        if len(page_numbers) != total_pages:
+            self.logger.info(
+                f"📑 Rango de páginas: {page_numbers.start + 1}-{page_numbers.stop}"
+            )
         self.logger.info(f"📁 Directorio de salida: {self.output_dir}")
 
         all_created_files = []
 
-        for page_num in range(total_pages):
-            self.logger.info(f"🔄 Procesando página {page_num + 1}/{total_pages}")
+        self._open_page_cache()
 
-            try:
-                created_files = self.separate_supports_from_page(pdf_document, page_num)
-                all_created_files.extend(created_files)
+        if self.dedupe:
+            self._deduplicator = SupportDeduplicator(pdf_document)
 
-                if created_files:
-                    self.logger.info(
-                        f"✅ Página {page_num + 1}: {len(created_files)} soporte(s) creado(s)"
-                    )
-                else:
-                    self.logger.warning(
-                        f"⚠️ Página {page_num + 1}: No se crearon soportes"
+        try:
+            self._run_ocr_stage(pdf_document, page_numbers)
+
+            for page_num in page_numbers:
+                self.logger.info(f"🔄 Procesando página {page_num + 1}/{total_pages}")
+
+                try:
+                    created_files = self.separate_supports_from_page(
+                        pdf_document, page_num
                     )
+                    all_created_files.extend(created_files)
 
-            except Exception as e:
-                self.logger.error(f"❌ Error en página {page_num + 1}: {e}")
+                    if created_files:
+                        self.logger.info(
+                            f"✅ Página {page_num + 1}: {len(created_files)} soporte(s) creado(s)"
+                        )
+                    else:
+                        self.logger.warning(
+                            f"⚠️ Página {page_num + 1}: No se crearon soportes"
+                        )
 
-        pdf_document.close()
+                except Exception as e:
+                    self.logger.error(f"❌ Error en página {page_num + 1}: {e}")
+
+                self._end_page()
+        finally:
+            # Las páginas pendientes se confirman antes de cerrar la caché
+            self._pending_pages.append(self._current_page)
+            self._current_page = _PendingPage()
+            self._drain_pages(block=True)
+            self._close_page_cache()
+            self._ocr_texts = {}
+            self._deduplicator = None
 
-        if all_created_files:
-            self.logger.info(
-                f"🎉 Procesamiento completado: {len(all_created_files)} archivos creados"
-            )
+        self.logger.info(
+            f"🧩 Plantillas de página: {len(self._layout_cache)} distintas, "
+            f"{self._layout_cache_hits} reutilizadas desde caché"
+        )
 
-            metadata = self.extract_metadata(fitz.open(str(self.input_pdf_path)))
-            self.create_summary_report(metadata, all_created_files)
-        else:
+        return all_created_files
+
+    def _finish_separation(self, pdf_document, created_files):
+        """Registra el resultado y escribe el resumen"""
+        if not created_files:
             self.logger.warning("⚠️ No se crearon archivos de salida")
+            return
 
-        return all_created_files
+        duplicates = sum(1 for info in created_files if info.duplicate_of)
+        self.logger.info(
+            f"🎉 Procesamiento completado: {len(created_files) - duplicates} "
+            "archivos creados"
+        )
+        if duplicates:
+            self.logger.info(f"♊ {duplicates} soporte(s) duplicado(s) sin archivo propio")
+
+        metadata = self.extract_metadata(pdf_document)
+        with self.timings.stage("informes"):
+            self.create_summary_report(metadata, created_files)
+
+    def _run_ocr_stage(self, pdf_document, page_numbers):
+        """Reconoce por OCR, en paralelo, las páginas escaneadas sin capa de texto"""
+        self._ocr_texts = {}
+        if not self.ocr:
+            return
+
+        with self.timings.stage("ocr"):
+            scanned_pages = find_scanned_pages(pdf_document, page_numbers)
+            if not scanned_pages:
+                return
+            if not ocr_available():
+                self.logger.warning(
+                    f"⚠️ {len(scanned_pages)} página(s) escaneada(s), pero Tesseract "
+                    "no está instalado; se omite el OCR"
+                )
+                return
+
+            # Sin caché de páginas, el OCR usa igualmente la misma base de datos
+            # para no reconocer dos veces un escaneo ya visto
+            ocr_cache = self._page_cache
+            if ocr_cache is None:
+                ocr_cache = self._open_ocr_cache()
+            try:
+                stage = OcrStage(
+                    self.input_pdf_path,
+                    dpi=self.ocr_dpi,
+                    language=self.ocr_language,
+                    workers=self.ocr_workers,
+                    cache=ocr_cache,
+                )
+                self._ocr_texts = stage.run(pdf_document, scanned_pages)
+            finally:
+                if ocr_cache is not None and ocr_cache is not self._page_cache:
+                    ocr_cache.close()
+
+    def _open_ocr_cache(self) -> Optional[PageResultCache]:
+        """Abre la caché persistente solo para los textos de OCR"""
+        try:
+            return PageResultCache(
+                self.report_dir / PAGE_CACHE_FILENAME, PROCESSOR_VERSION
+            )
+        except Exception as e:
+            self.logger.warning(f"No se pudo abrir la caché de OCR: {e}")
+            return None
+
+    def _compute_mapping_hash(self) -> str:
+        """Hash del mapeo y columnas que determinan las decisiones de renombrado"""
+        payload = json.dumps(
+            {
+                "columns": list(self.mapping_columns or ()),
+                "fuzzy_distance": self.fuzzy_distance,
+                "mapping": sorted(self.search_to_rename_map.items()),
+            },
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _open_page_cache(self):
+        """Abre la caché persistente de páginas en la carpeta de salida"""
+        if not self.use_page_cache:
+            return
+        try:
+            self._pdf_hash = self._input_sha256()
+            self._mapping_hash = self._compute_mapping_hash()
+            self._page_cache = PageResultCache(
+                self.report_dir / PAGE_CACHE_FILENAME, PROCESSOR_VERSION
+            )
+            if self.resume:
+                self.logger.info("♻️ Reanudando: se reutilizarán páginas ya procesadas")
+        except Exception as e:
+            self.logger.warning(f"No se pudo abrir la caché de páginas: {e}")
+            self._page_cache = None
+
+    def _close_page_cache(self):
+        if self._page_cache is None:
+            return
+        try:
+            self._page_cache.close()
+        except Exception as e:
+            self.logger.warning(f"No se pudo cerrar la caché de páginas: {e}")
+        self._page_cache = None
 
     def create_summary_report(self, metadata, created_files):
         """Crea un informe resumen del procesamiento"""
         try:
-            report_path = self.output_dir / "resumen_procesamiento.txt"
+            report_path = self.report_dir / "resumen_procesamiento.txt"
 
             with open(report_path, "w", encoding="utf-8") as f:
                 f.write("=== RESUMEN DE PROCESAMIENTO ===\n\n")
                 f.write(f"Archivo procesado: {self.input_pdf_path.name}\n")
                 f.write(
-                    f"Fecha de procesamiento: {self.logger.handlers[0].formatter.formatTime if self.logger.handlers else 'N/A'}\n"
+                    f"Fecha de procesamiento: {datetime.now():%Y-%m-%d %H:%M:%S}\n"
                 )
                 f.write(f"Total de páginas: {metadata['total_pages']}\n")
-                f.write(f"Archivos creados: {len(created_files)}\n\n")
+                duplicates = sum(1 for info in created_files if info.duplicate_of)
+                f.write(f"Archivos creados: {len(created_files) - duplicates}\n")
+                if duplicates:
+                    f.write(f"Soportes duplicados (sin archivo propio): {duplicates}\n")
+                f.write("\n")
 
                 f.write("=== ARCHIVOS CREADOS ===\n")
                 for i, file_info in enumerate(created_files, 1):
-                    f.write(f"{i}. {Path(file_info['file']).name}\n")
-                    f.write(f"   - Página: {file_info['page']}\n")
-                    f.write(f"   - Soporte: {file_info['support']}\n")
+                    f.write(f"{i}. {Path(file_info.file).name}\n")
+                    f.write(f"   - Página: {file_info.page}\n")
+                    f.write(f"   - Soporte: {file_info.support}\n")
+                    f.write(f"   - Valor de renombrado: {file_info.rename_value}\n")
+                    f.write(f"   - Confianza: {file_info.confidence:.2f}\n")
+                    if file_info.duplicate_of:
+                        f.write(f"   - Duplicado de: {file_info.duplicate_of}\n")
+                    f.write("\n")
+
+                timing_summary = self.timings.summary()
+                f.write("=== TIEMPOS POR ETAPA ===\n")
+                f.write(
+                    f"Tiempo total: {timing_summary['total_ejecucion_s']:.2f} s\n"
+                )
+                for stage, stats in timing_summary["etapas"].items():
                     f.write(
-                        f"   - Valor de renombrado: {file_info.get('rename_value', 'N/A')}\n"
+                        f"- {stage}: {stats['total_s']:.3f} s "
+                        f"({stats['llamadas']} llamadas, "
+                        f"{stats['promedio_ms']:.2f} ms/llamada, "
+                        f"{stats['porcentaje']:.1f}%)\n"
                     )
-                    f.write(f"   - Confianza: {file_info.get('confidence', 0):.2f}\n\n")
 
             self.logger.info(f"📋 Resumen guardado en: {report_path}")
 
         except Exception as e:
             self.logger.error(f"Error creando resumen: {e}")
 
+        self.save_timing_report()
+
+    def save_timing_report(self):
+        """Guarda los tiempos por etapa en formato JSON"""
+        report_path = self.report_dir / "tiempos_procesamiento.json"
+        try:
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump(self.timings.summary(), f, indent=2, ensure_ascii=False)
+            self.logger.debug(f"Tiempos por etapa guardados en: {report_path}")
+        except Exception as e:
+            self.logger.warning(f"No se pudieron guardar los tiempos: {e}")
+
     def extract_payment_info(self, page, region=None):
         """Extrae información específica de pago de una región de página"""
         if region:
@@ -758,6 +1688,13 @@ class PDFProcessor:
         else:
             text = page.get_text()
 
+        layout = WordLayout(page.get_text("words"), region)
+        return self._extract_payment_info_from_text(text, layout)
+
+    def _extract_payment_info_from_text(
+        self, text: str, layout: Optional[WordLayout] = None
+    ) -> dict:
+        """Extrae los datos de pago por posición y, si falla, con regex"""
         payment_info = {
             "reference_number": None,
             "amount": None,
@@ -769,9 +1706,9 @@ class PDFProcessor:
 
         patterns = {
             "reference_number": [
-                r"(?:reference|ref|número|numero|nro)[\s:]*([A-Z0-9]+)",
-                r"transaction\s+reference\s+number[\s:]*([A-Z0-9]+)",
-                r"codigo[\s:]*([A-Z0-9]+)",
+                r"(?:reference|referencia|ref|número|numero|nro)[\s:]*((?=[A-Z0-9\-]*\d)[A-Z0-9\-]{4,})",
+                r"transaction\s+reference\s+number[\s:]*((?=[A-Z0-9\-]*\d)[A-Z0-9\-]{4,})",
+                r"codigo[\s:]*((?=[A-Z0-9\-]*\d)[A-Z0-9\-]{4,})",
             ],
             "amount": [
                 r"(?:valor|amount|monto)[\s:]*([0-9,\.]+)",
@@ -793,7 +1730,13 @@ class PDFProcessor:
             ],
         }
 
+        if layout is not None:
+            for field, (labels, pattern, multiword) in PAYMENT_FIELD_LAYOUT.items():
+                payment_info[field] = layout.value_after(labels, pattern, multiword)
+
         for field, field_patterns in patterns.items():
+            if payment_info[field]:
+                continue
             for pattern in field_patterns:
                 matches = re.findall(pattern, text, re.IGNORECASE)
                 if matches:
@@ -804,11 +1747,22 @@ class PDFProcessor:
 
     def create_detailed_summary_report(self, metadata, created_files):
         """Crea un informe detallado con información extraída de cada soporte"""
+        with self.timings.stage("informes"):
+            self._create_detailed_summary_report(metadata, created_files)
+        self.save_timing_report()
+
+    def _create_detailed_summary_report(self, metadata, created_files):
+        import fitz
+
         try:
-            report_data = []
+            report_writer = self._open_report_writer()
+        except Exception as e:
+            self.logger.error(f"Error creando informe detallado: {e}")
+            return
 
+        try:
             for file_info in created_files:
-                file_path = Path(file_info["file"])
+                file_path = Path(file_info.file)
 
                 if file_path.exists():
                     pdf_doc = fitz.open(str(file_path))
@@ -816,131 +1770,70 @@ class PDFProcessor:
                         page = pdf_doc[0]
                         payment_info = self.extract_payment_info(page)
 
-                        report_data.append(
-                            {
-                                "archivo": file_path.name,
-                                "pagina_original": file_info["page"],
-                                "soporte_numero": file_info["support"],
-                                "valor_renombrado": file_info.get(
-                                    "rename_value", "N/A"
-                                ),
-                                "confianza": file_info.get("confidence", 0),
-                                "numero_referencia": payment_info.get(
-                                    "reference_number", ""
-                                ),
-                                "monto": payment_info.get("amount", ""),
-                                "fecha": payment_info.get("date", ""),
-                                "beneficiario": payment_info.get("beneficiary", ""),
-                                "cuenta": payment_info.get("account", ""),
-                                "banco": payment_info.get("bank", ""),
-                            }
+                        report_writer.append(
+                            self._build_report_row(file_info, payment_info)
                         )
 
                     pdf_doc.close()
 
-            if self.export_format == "xlsx" and Workbook is not None:
-                self._save_xlsx_report(report_data, metadata)
-            else:
-                self._save_csv_report(report_data, metadata)
+            self._close_report_writer(report_writer)
 
         except Exception as e:
+            report_writer.close()
             self.logger.error(f"Error creando informe detallado: {e}")
 
-    def _save_csv_report(self, report_data, metadata):
-        """Guarda el informe en formato CSV"""
-        report_path = self.output_dir / "informe_detallado.csv"
-
-        import csv
-
-        fieldnames = [
-            "archivo",
-            "pagina_original",
-            "soporte_numero",
-            "valor_renombrado",
-            "confianza",
-            "numero_referencia",
-            "monto",
-            "fecha",
-            "beneficiario",
-            "cuenta",
-            "banco",
-        ]
-
-        with open(report_path, "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(report_data)
-
-        self.logger.info(f"📊 Informe CSV guardado en: {report_path}")
-
-    def _save_xlsx_report(self, report_data, metadata):
-        """Guarda el informe en formato Excel"""
-        report_path = self.output_dir / "informe_detallado.xlsx"
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Soportes Procesados"
-
-        headers = [
-            "Archivo",
-            "Página Original",
-            "Soporte #",
-            "Valor Renombrado",
-            "Confianza",
-            "Número Referencia",
-            "Monto",
-            "Fecha",
-            "Beneficiario",
-            "Cuenta",
-            "Banco",
-        ]
-
-        ws.append(headers)
-
-        for row_data in report_data:
-            row = [
-                row_data["archivo"],
-                row_data["pagina_original"],
-                row_data["soporte_numero"],
-                row_data["valor_renombrado"],
-                row_data["confianza"],
-                row_data["numero_referencia"],
-                row_data["monto"],
-                row_data["fecha"],
-                row_data["beneficiario"],
-                row_data["cuenta"],
-                row_data["banco"],
-            ]
-            ws.append(row)
+    def _build_report_row(self, file_info, payment_info) -> ReportRow:
+        return ReportRow(
+            Path(file_info.file).name,
+            file_info.page,
+            file_info.support,
+            file_info.rename_value,
+            file_info.confidence,
+            payment_info.get("reference_number"),
+            payment_info.get("amount"),
+            payment_info.get("date"),
+            payment_info.get("beneficiary"),
+            payment_info.get("account"),
+            payment_info.get("bank"),
+            file_info.duplicate_of,
+        )
 
-        wb.save(str(report_path))
-        self.logger.info(f"📊 Informe Excel guardado en: {report_path}")
+    def _open_report_writer(self):
+        """Abre el informe detallado para ir añadiendo filas a medida que se generan"""
+        export_format = self.export_format
+        if not REPORT_WRITERS[export_format].available():
+            self.logger.warning(
+                f"Formato '{export_format}' no disponible (falta su dependencia), se usará CSV"
+            )
+            export_format = "csv"
+        return open_report_writer(export_format, self.report_dir)
+
+    def _close_report_writer(self, report_writer):
+        report_writer.close()
+        self.logger.info(
+            f"📊 Informe {report_writer.label} guardado en: {report_writer.path}"
+        )
 
     def extract_text_from_pages(self):
         """Extrae y guarda el texto de cada página del PDF original"""
+        self._extract_text_from_pages()
+        self.save_timing_report()
+
+    def _extract_text_from_pages(self):
         try:
             text_dir = self.output_dir / "textos_extraidos"
             text_dir.mkdir(exist_ok=True)
+            self._text_export_dir = text_dir
 
-            pdf_document = fitz.open(str(self.input_pdf_path))
-
-            for page_num in range(pdf_document.page_count):
-                page = pdf_document[page_num]
-                text = page.get_text()
-
-                if text.strip():
-                    text_file = text_dir / f"pagina_{page_num + 1}_texto.txt"
-
-                    with open(text_file, "w", encoding="utf-8") as f:
-                        f.write(f"=== TEXTO DE PÁGINA {page_num + 1} ===\n\n")
-                        f.write(text)
-
-                    self.logger.debug(
-                        f"Texto extraído de página {page_num + 1}: {text_file}"
-                    )
+            with self._document_session() as pdf_document, self._writer_session():
+                for page_num in self._page_numbers(pdf_document.page_count):
+                    with self.timings.stage("extraccion_texto"):
+                        text = pdf_document[page_num].get_text()
+                    self._export_page_text(page_num, text)
 
-            pdf_document.close()
             self.logger.info(f"📝 Textos extraídos guardados en: {text_dir}")
 
         except Exception as e:
             self.logger.error(f"Error extrayendo textos: {e}")
+        finally:
+            self._text_export_dir = None
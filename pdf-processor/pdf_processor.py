@@ -1,9 +1,24 @@
-from pdf_core import PDFProcessor
 from logger_config import setup_default_logging, get_logger
-from pdf_cli import main
 
 # Mantener la interfaz original
 __all__ = ["PDFProcessor", "setup_default_logging", "get_logger", "main"]
 
+
+def __getattr__(name):
+    # PDFProcessor y main se cargan bajo demanda para no importar el CLI
+    # (argparse) ni el núcleo al importar este módulo
+    if name == "PDFProcessor":
+        from pdf_core import PDFProcessor
+
+        return PDFProcessor
+    if name == "main":
+        from pdf_cli import main
+
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
+    from pdf_cli import main
+
     main()
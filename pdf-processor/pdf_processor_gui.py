@@ -596,7 +596,7 @@ class PDFProcessorGUI:
         format_combo = ttk.Combobox(
             format_left,
             textvariable=self.export_format_var,
-            values=["csv", "xlsx"],
+            values=["csv", "xlsx", "jsonl", "parquet"],
             state="readonly",
             style="Modern.TEntry",
             width=15,
@@ -894,6 +894,10 @@ class PDFProcessorGUI:
             desc = "📋 CSV (Valores separados por comas)\n• Formato universal y ligero\n• Compatible con Excel y editores de texto\n• Ideal para análisis de datos"
         elif format_val == "xlsx":
             desc = "📊 XLSX (Excel nativo)\n• Formato nativo de Microsoft Excel\n• Soporte para fórmulas y formato\n• Mejor para presentaciones"
+        elif format_val == "jsonl":
+            desc = "🧾 JSONL (JSON por líneas)\n• Una fila tipada por línea\n• Se puede leer de forma incremental\n• Ideal para procesos de conciliación"
+        elif format_val == "parquet":
+            desc = "🗃️ Parquet (columnar)\n• Tipos explícitos y compresión\n• Carga rápida en herramientas analíticas\n• Requiere pyarrow instalado"
         else:
             desc = "Seleccione un formato para ver detalles"
 
@@ -934,6 +938,7 @@ class PDFProcessorGUI:
         threading.Thread(target=self.process_pdf, daemon=True).start()
 
     def process_pdf(self):
+        processor = None
         try:
             self.progress_var.set("Iniciando procesamiento...")
             self.log_message("=" * 50)
@@ -993,30 +998,23 @@ class PDFProcessorGUI:
                 self.log_window.add_log(
                     "📄 Iniciando separación de páginas...", "PROGRESS"
                 )
-            created_files = processor.separate_pages()
-
             if self.extract_text_var.get():
-                self.progress_var.set("Extrayendo texto...")
-                self.log_message("Extrayendo texto de las páginas...")
+                self.log_message("Se extraerá también el texto de las páginas")
                 if self.log_window:
                     self.log_window.add_log(
-                        "📝 Extrayendo texto de páginas...", "PROGRESS"
+                        "📝 Se extraerá el texto de cada página", "PROGRESS"
                     )
-                processor.extract_text_from_pages()
-
             if self.detailed_info_var.get():
-                self.progress_var.set("Generando información detallada...")
-                self.log_message("Extrayendo información detallada de soportes...")
+                self.log_message("Se generará el informe detallado de soportes")
                 if self.log_window:
                     self.log_window.add_log(
-                        "📊 Generando información detallada...", "PROGRESS"
+                        "📊 Se generará el informe detallado", "PROGRESS"
                     )
-                import fitz
 
-                pdf_doc = fitz.open(self.pdf_file_path.get())
-                metadata = processor.extract_metadata(pdf_doc)
-                pdf_doc.close()
-                processor.create_detailed_summary_report(metadata, created_files)
+            created_files = processor.process(
+                extract_text=self.extract_text_var.get(),
+                detailed_info=self.detailed_info_var.get(),
+            )
 
             self.progress_var.set("¡Procesamiento completado exitosamente!")
             self.log_message("=" * 50)
@@ -1054,6 +1052,8 @@ class PDFProcessorGUI:
             err_msg = str(e)
             self.root.after(0, lambda m=err_msg: messagebox.showerror("Error", m))
         finally:
+            if processor is not None:
+                processor.close_document()
             self.processing = False
             self.root.after(0, lambda: self.process_button.config(state="normal"))
             self.root.after(0, lambda: self.progress_bar.stop())
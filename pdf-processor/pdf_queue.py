@@ -0,0 +1,323 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+from logger_config import get_logger, setup_default_logging
+
+# Subcarpeta de la salida compartida donde cada intento de un trabajo escribe
+# sus soportes e informe; merge mueve a la salida solo los del intento ganador
+JOBS_DIRNAME = ".trabajos"
+REPORT_FILENAME = "informe_detallado.jsonl"
+
+# Nombres finales que merge dio a los soportes de un intento, para poder
+# repetir merge sin volver a moverlos
+MOVED_FILENAME = "movidos.json"
+
+# Espera entre consultas a la cola vacía cuando se usa --wait
+POLL_SECONDS = 5
+
+
+class LeaseKeeper:
+    """Renueva en segundo plano la concesión de un trabajo mientras se procesa"""
+
+    def __init__(self, queue, job_id: int, token: str, lease_seconds: float):
+        self.queue = queue
+        self.job_id = job_id
+        self.token = token
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="pdf-queue-lease", daemon=True
+        )
+
+    def _run(self):
+        logger = get_logger("pdf_processor")
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.renew(self.job_id, self.token, self.lease_seconds):
+                    self.lost = True
+                    logger.warning(
+                        f"⚠️ Trabajo {self.job_id}: se perdió la concesión; "
+                        "otro trabajador lo repetirá"
+                    )
+                    return
+            except Exception as e:
+                logger.warning(f"No se pudo renovar la concesión: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def enqueue_command(args):
+    import fitz
+    from job_queue import SqliteJobQueue
+
+    queue = SqliteJobQueue(args.queue)
+    mapping_id = queue.register_mapping(
+        str(Path(args.initial_excel).resolve()), args.search_column, args.rename_column
+    )
+    options = {
+        "clip_mode": args.clip_mode,
+        "fuzzy_distance": args.fuzzy_distance,
+        "dedupe": args.dedupe,
+    }
+
+    total_jobs = 0
+    for pdf in args.input_pdfs:
+        pdf_path = Path(pdf).resolve()
+        with fitz.open(str(pdf_path)) as document:
+            page_count = document.page_count
+
+        for first_page in range(1, page_count + 1, args.pages_per_job):
+            last_page = min(first_page + args.pages_per_job - 1, page_count)
+            queue.enqueue(str(pdf_path), first_page, last_page, mapping_id, options)
+            total_jobs += 1
+
+        print(f"📥 {pdf_path.name}: {page_count} páginas encoladas")
+
+    print(f"✅ {total_jobs} trabajo(s) añadidos a {args.queue}")
+
+
+def _run_job(queue, job, output_dir: Path, mappings: dict, writer_threads: int):
+    from pdf_core import PDFProcessor
+
+    spec = queue.get_mapping(job.mapping_id)
+    mapping = mappings.get(job.mapping_id)
+    # Cada intento tiene su carpeta: si una concesión caduca y otro trabajador
+    # repite el trabajo, los dos intentos no se pisan
+    attempt_dir = output_dir / JOBS_DIRNAME / f"trabajo_{job.id}_{job.token}"
+
+    processor = PDFProcessor(
+        job.pdf,
+        attempt_dir,
+        export_format="jsonl",
+        initial_excel_path=spec.excel if mapping is None else None,
+        mapping_columns=(spec.search_column, spec.rename_column),
+        mapping=mapping,
+        pages=(job.first_page, job.last_page),
+        writer_threads=writer_threads,
+        **job.options,
+    )
+    if not processor.search_to_rename_map:
+        raise RuntimeError(f"No se pudo cargar el mapeo desde {spec.excel}")
+    mappings[job.mapping_id] = processor.search_to_rename_map
+
+    with processor:
+        created_files = processor.process(detailed_info=True)
+
+    return {
+        "soportes": len(created_files),
+        "duplicados": sum(1 for info in created_files if info.duplicate_of),
+        # Relativa a la salida compartida: cada máquina la monta donde quiera
+        "directorio": attempt_dir.relative_to(output_dir).as_posix(),
+    }
+
+
+def work_command(args):
+    from job_queue import SqliteJobQueue
+
+    logger = get_logger("pdf_processor")
+    queue = SqliteJobQueue(args.queue)
+    output_dir = Path(args.output).resolve()
+    worker = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    mappings = {}
+    processed = 0
+
+    logger.info(f"👷 Trabajador {worker} escuchando {args.queue}")
+
+    while True:
+        job = queue.claim(worker, args.lease)
+        if job is None:
+            if not args.wait:
+                break
+            time.sleep(POLL_SECONDS)
+            continue
+
+        logger.info(
+            f"📦 Trabajo {job.id}: {Path(job.pdf).name} páginas "
+            f"{job.first_page}-{job.last_page} (intento {job.attempts})"
+        )
+        with LeaseKeeper(queue, job.id, job.token, args.lease) as lease:
+            try:
+                result = _run_job(queue, job, output_dir, mappings, args.writer_threads)
+            except Exception as e:
+                logger.error(f"❌ Trabajo {job.id} falló: {e}")
+                queue.fail(job.id, job.token, str(e))
+                continue
+
+        if lease.lost or not queue.complete(job.id, job.token, result):
+            logger.warning(f"⚠️ Trabajo {job.id}: resultado descartado")
+            continue
+
+        processed += 1
+        logger.info(f"✅ Trabajo {job.id} terminado: {result['soportes']} soporte(s)")
+
+    print(f"✅ Trabajador {worker}: {processed} trabajo(s) completado(s)")
+
+
+def _move_supports(attempt_dir: Path, rows, registry) -> dict:
+    """Mueve a la salida los soportes de un intento; devuelve sus nombres finales"""
+    moved_path = attempt_dir / MOVED_FILENAME
+    moved = {}
+    if moved_path.is_file():
+        moved = json.loads(moved_path.read_text(encoding="utf-8"))
+
+    for row in rows:
+        name = row.archivo
+        if name in moved or row.duplicado_de:
+            continue
+        source = attempt_dir / name
+        if not source.is_file():
+            continue
+        target = registry.allocate(name)
+        os.replace(source, target)
+        moved[name] = target.name
+
+    moved_path.write_text(json.dumps(moved, ensure_ascii=False), encoding="utf-8")
+    return moved
+
+
+def merge_command(args):
+    from job_queue import DONE, SqliteJobQueue
+    from name_registry import OutputNameRegistry
+    from report_writers import open_report_writer, read_jsonl_report
+
+    queue = SqliteJobQueue(args.queue)
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    registry = OutputNameRegistry(output_dir)
+
+    counts = queue.counts()
+    unfinished = sum(count for state, count in counts.items() if state != DONE)
+    if unfinished:
+        print(f"⚠️ Quedan {unfinished} trabajo(s) sin terminar: {counts}")
+
+    writer = open_report_writer(args.export_format, output_dir)
+    try:
+        for job in queue.finished_jobs():
+            # Solo cuenta el intento que completó el trabajo en la cola
+            attempt_dir = output_dir / job["result"].get("directorio", "")
+            report_path = attempt_dir / REPORT_FILENAME
+            if not job["result"].get("directorio") or not report_path.is_file():
+                print(f"⚠️ Trabajo {job['id']}: no se encontró {report_path}")
+                continue
+            rows = list(read_jsonl_report(report_path))
+            moved = _move_supports(attempt_dir, rows, registry)
+            for row in rows:
+                row.archivo = moved.get(row.archivo, row.archivo)
+                writer.append(row)
+    finally:
+        writer.close()
+
+    print(f"📊 Informe combinado ({writer.rows} filas): {writer.path}")
+
+
+def status_command(args):
+    from job_queue import SqliteJobQueue
+
+    counts = SqliteJobQueue(args.queue).counts()
+    if not counts:
+        print("La cola está vacía")
+    for state, count in sorted(counts.items()):
+        print(f"{state}: {count}")
+
+
+def main():
+    """Cola de trabajos para repartir el procesamiento entre varias máquinas"""
+    setup_default_logging()
+
+    parser = argparse.ArgumentParser(
+        description="Reparte el procesamiento de PDFs entre varios trabajadores",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  python pdf_queue.py enqueue --queue cola.sqlite pagos.pdf --initial-excel datos.xlsx --search-column "Ref" --rename-column "Nombre"
+  python pdf_queue.py work --queue cola.sqlite -o ./soportes
+  python pdf_queue.py merge --queue cola.sqlite -o ./soportes --export-format xlsx
+    """,
+    )
+    parser.add_argument(
+        "--queue", required=True, help="Archivo SQLite de la cola (compartido)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue", help="Encolar PDFs por rangos de páginas")
+    enqueue.add_argument("input_pdfs", nargs="+", help="PDFs a procesar")
+    enqueue.add_argument("--initial-excel", required=True, help="Excel con el mapeo")
+    enqueue.add_argument("--search-column", required=True, help="Columna de búsqueda")
+    enqueue.add_argument("--rename-column", required=True, help="Columna de renombrado")
+    enqueue.add_argument(
+        "--pages-per-job",
+        type=int,
+        default=50,
+        help="Páginas por trabajo (por defecto: 50)",
+    )
+    enqueue.add_argument("--clip-mode", choices=["xobject", "crop"], default="xobject")
+    enqueue.add_argument("--fuzzy-distance", type=int, default=0)
+    enqueue.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Deduplicar soportes (solo dentro de cada trabajo)",
+    )
+    enqueue.set_defaults(handler=enqueue_command)
+
+    work = subparsers.add_parser("work", help="Procesar trabajos de la cola")
+    work.add_argument(
+        "-o", "--output", required=True, help="Directorio de salida compartido"
+    )
+    work.add_argument(
+        "--lease",
+        type=float,
+        default=300,
+        help="Duración en segundos de la concesión de cada trabajo (por defecto: 300)",
+    )
+    work.add_argument("--worker-id", default=None, help="Nombre del trabajador")
+    work.add_argument(
+        "--wait",
+        action="store_true",
+        help="Seguir esperando trabajos nuevos cuando la cola esté vacía",
+    )
+    work.add_argument("--writer-threads", type=int, default=4)
+    work.set_defaults(handler=work_command)
+
+    merge = subparsers.add_parser(
+        "merge",
+        help="Mover a la salida los soportes de los trabajos y combinar sus informes",
+    )
+    merge.add_argument("-o", "--output", required=True, help="Directorio de salida")
+    merge.add_argument(
+        "--export-format",
+        choices=["csv", "xlsx", "jsonl", "parquet"],
+        default="csv",
+    )
+    merge.set_defaults(handler=merge_command)
+
+    status = subparsers.add_parser("status", help="Mostrar el estado de la cola")
+    status.set_defaults(handler=status_command)
+
+    args = parser.parse_args()
+    if getattr(args, "pages_per_job", 1) < 1:
+        parser.error("--pages-per-job debe ser mayor que cero")
+
+    try:
+        args.handler(args)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
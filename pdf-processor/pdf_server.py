@@ -0,0 +1,505 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from logger_config import get_logger, setup_default_logging
+
+# Estado precargado de cada proceso del pool: mapeo, columnas y motor de búsqueda
+_worker_state = {}
+
+# Tamaño de bloque al copiar archivos en la respuesta
+CHUNK_SIZE = 1024 * 1024
+
+# Cada cuánto se buscan resultados en modo manifiesto ya caducados
+CLEANUP_INTERVAL = 60
+
+
+def _init_worker(mapping, mapping_columns, fuzzy_distance):
+    from matchers import MatcherEngine
+
+    setup_default_logging()
+    _worker_state["mapping"] = mapping
+    _worker_state["mapping_columns"] = mapping_columns
+    _worker_state["fuzzy_distance"] = fuzzy_distance
+    _worker_state["matcher"] = MatcherEngine(mapping, fuzzy_distance)
+
+
+def _process_request(pdf_path: str, output_dir: str, options: dict) -> dict:
+    """Separa un PDF dentro de un proceso del pool con el estado ya cargado"""
+    from pdf_core import PDFProcessor
+
+    started = time.time()
+    processor = PDFProcessor(
+        pdf_path,
+        output_dir,
+        mapping_columns=_worker_state["mapping_columns"],
+        mapping=_worker_state["mapping"],
+        matcher=_worker_state["matcher"],
+        fuzzy_distance=_worker_state["fuzzy_distance"],
+        use_page_cache=False,
+        clip_mode=options.get("clip_mode", "xobject"),
+        dedupe=options.get("dedupe", False),
+    )
+    with processor:
+        created_files = processor.process(detailed_info=options.get("informe", False))
+
+    manifest = [
+        {
+            "archivo": Path(info.file).name,
+            "pagina": info.page,
+            "soporte": info.support,
+            "valor_renombrado": info.rename_value,
+            "confianza": info.confidence,
+            "duplicado_de": info.duplicate_of,
+        }
+        for info in created_files
+    ]
+    reports = [
+        path.name
+        for path in processor.report_dir.glob("informe_detallado.*")
+        if path.is_file()
+    ]
+    return {
+        "inicio": started,
+        "soportes": manifest,
+        "informes": reports,
+        "etapas": processor.timings.summary()["etapas"],
+    }
+
+
+class ProcessingService:
+    """Pool acotado de procesos con el mapeo cargado y una cola de espera limitada.
+
+    Como mucho workers peticiones se procesan a la vez y max_queue esperan
+    turno; el resto se rechaza de inmediato para que el portal pueda
+    reintentar en lugar de acumular conexiones abiertas. Un turno solo se
+    libera cuando su proceso termina de verdad, aunque el cliente haya dejado
+    de esperar. Los resultados en modo manifiesto se borran al pasar
+    results_ttl segundos. Si un proceso del pool muere, el pool se sustituye
+    por uno nuevo y solo fallan las peticiones que estaban en él.
+    """
+
+    def __init__(
+        self,
+        mapping,
+        mapping_columns,
+        fuzzy_distance,
+        work_dir,
+        workers,
+        max_queue,
+        timeout,
+        results_ttl,
+    ):
+        self.work_dir = Path(work_dir).resolve()
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.results_ttl = results_ttl
+        self.mapping_size = len(mapping)
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._active_dirs = set()
+        self._worker_args = (mapping, mapping_columns, fuzzy_distance)
+        self._pool = self._new_pool()
+        self._stop = threading.Event()
+        self._cleaner = threading.Thread(
+            target=self._cleanup_loop, name="pdf-server-cleanup", daemon=True
+        )
+        self._cleaner.start()
+
+    def try_admit(self) -> bool:
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._admitted += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self._admitted -= 1
+        self._slots.release()
+
+    def status(self) -> dict:
+        with self._lock:
+            admitted = self._admitted
+        return {
+            "trabajadores": self.workers,
+            "en_curso": min(admitted, self.workers),
+            "en_cola": max(admitted - self.workers, 0),
+            "cola_maxima": self.max_queue,
+            "entradas_mapeo": self.mapping_size,
+        }
+
+    def new_job_dir(self) -> Path:
+        job_dir = self.work_dir / uuid.uuid4().hex
+        job_dir.mkdir()
+        with self._lock:
+            self._active_dirs.add(job_dir)
+        return job_dir
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=self._worker_args,
+        )
+
+    def submit(self, pdf_path: Path, output_dir: Path, options: dict):
+        args = (str(pdf_path), str(output_dir), options)
+        with self._lock:
+            pool = self._pool
+        try:
+            future = pool.submit(_process_request, *args)
+        except BrokenProcessPool:
+            # Se rompió con otra petición y aún no se había sustituido
+            pool = self._replace_pool(pool)
+            future = pool.submit(_process_request, *args)
+        future.add_done_callback(lambda done: self._check_pool(pool, done))
+        return future
+
+    def _check_pool(self, pool, future):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._replace_pool(pool)
+
+    def _replace_pool(self, broken) -> ProcessPoolExecutor:
+        """Sustituye el pool roto, una sola vez aunque fallen varias peticiones"""
+        with self._lock:
+            if self._pool is not broken or self._stop.is_set():
+                return self._pool
+            self._pool = self._new_pool()
+            pool = self._pool
+        get_logger("pdf_processor").warning(
+            "⚠️ Un proceso del pool terminó de forma inesperada; se creó un pool nuevo"
+        )
+        broken.shutdown(wait=False)
+        return pool
+
+    def finish(self, job_dir, keep: bool = False):
+        """Libera el turno y borra la carpeta del trabajo, salvo que deba conservarse"""
+        if job_dir is not None:
+            with self._lock:
+                self._active_dirs.discard(job_dir)
+            if keep:
+                # La caducidad cuenta desde que se entregó el resultado
+                os.utime(job_dir)
+            else:
+                shutil.rmtree(job_dir, ignore_errors=True)
+        self.release()
+
+    def abandon(self, future, job_dir):
+        """Trabajo cuyo cliente ya no espera: el turno y la carpeta se liberan al acabar"""
+        if future.cancel():
+            self.finish(job_dir)
+        else:
+            future.add_done_callback(lambda _: self.finish(job_dir))
+
+    def _cleanup_loop(self):
+        while not self._stop.wait(min(CLEANUP_INTERVAL, self.results_ttl)):
+            self.remove_expired_results()
+
+    def remove_expired_results(self):
+        """Borra los resultados en modo manifiesto más antiguos que results_ttl"""
+        limit = time.time() - self.results_ttl
+        with self._lock:
+            active = set(self._active_dirs)
+        for job_dir in self.work_dir.iterdir():
+            try:
+                expired = job_dir.is_dir() and job_dir.stat().st_mtime < limit
+            except OSError:
+                continue
+            if expired and job_dir not in active:
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    def shutdown(self):
+        self._stop.set()
+        with self._lock:
+            pool = self._pool
+        pool.shutdown(wait=True)
+
+
+def _server_timing(received: float, result: dict) -> str:
+    """Cabecera Server-Timing con la espera en cola y las etapas del procesador"""
+    parts = [
+        f"cola;dur={max(result['inicio'] - received, 0) * 1000:.1f}",
+        f"total;dur={(time.time() - received) * 1000:.1f}",
+    ]
+    for stage, data in result["etapas"].items():
+        parts.append(f"{stage};dur={data['total_s'] * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ProcessingHandler(BaseHTTPRequestHandler):
+    server_version = "PDFProcessor"
+
+    @property
+    def service(self) -> ProcessingService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        get_logger("pdf_processor").info(f"🌐 {self.address_string()} {format % args}")
+
+    def _send_json(self, status: int, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/estado":
+            self._send_json(200, self.service.status())
+        else:
+            self._send_json(404, {"error": "Ruta no encontrada"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/procesar":
+            self._send_json(404, {"error": "Ruta no encontrada"})
+            return
+
+        received = time.time()
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        response_format = query.get("formato", "zip")
+        if response_format not in ("zip", "manifiesto"):
+            self._send_json(400, {"error": "formato debe ser 'zip' o 'manifiesto'"})
+            return
+
+        if not self.service.try_admit():
+            self._send_json(
+                503,
+                {"error": "Servidor ocupado, reintente más tarde"},
+                {"Retry-After": "5"},
+            )
+            return
+
+        job_dir = None
+        keep_results = False
+        finished = True
+        try:
+            job_dir = self.service.new_job_dir()
+            pdf_path = self._read_input(job_dir)
+            if pdf_path is None:
+                return
+
+            options = {
+                "clip_mode": query.get("clip_mode", "xobject"),
+                "dedupe": query.get("dedupe") in ("1", "true", "si"),
+                "informe": query.get("informe") in ("1", "true", "si"),
+            }
+            output_dir = job_dir / "soportes"
+            try:
+                future = self.service.submit(pdf_path, output_dir, options)
+                result = future.result(timeout=self.service.timeout)
+            except BrokenProcessPool:
+                # El pool ya se sustituyó; la petición puede reintentarse
+                self._send_json(
+                    503,
+                    {"error": "El proceso de trabajo terminó de forma inesperada, reintente"},
+                    {"Retry-After": "1"},
+                )
+                return
+            except FutureTimeoutError:
+                # El proceso sigue ocupando su turno y escribiendo en job_dir
+                # hasta que termine; se liberan entonces y no ahora
+                self.service.abandon(future, job_dir)
+                finished = False
+                self._send_json(504, {"error": "Tiempo de procesamiento agotado"})
+                return
+
+            timing = _server_timing(received, result)
+            if response_format == "manifiesto":
+                self._send_json(
+                    200,
+                    {
+                        "directorio": str(output_dir),
+                        "expira_en_s": self.service.results_ttl,
+                        "soportes": result["soportes"],
+                        "informes": result["informes"],
+                    },
+                    {"Server-Timing": timing},
+                )
+                keep_results = True
+            else:
+                self._send_zip(output_dir, result, timing)
+        except Exception as e:
+            get_logger("pdf_processor").error(f"❌ Error procesando petición: {e}")
+            try:
+                self._send_json(500, {"error": str(e)})
+            except Exception:
+                pass
+        finally:
+            # En modo manifiesto los archivos se conservan hasta que caduquen
+            # para que el portal los recoja; en modo zip ya viajaron en la respuesta
+            if finished:
+                self.service.finish(job_dir, keep=keep_results)
+
+    def _read_input(self, job_dir: Path):
+        """Guarda el PDF subido o valida la ruta indicada en JSON ({"ruta": ...})"""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self._send_json(411, {"error": "Falta el cuerpo de la petición"})
+            return None
+        if length > self.server.max_upload:
+            self._send_json(413, {"error": "Archivo demasiado grande"})
+            return None
+
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("application/json"):
+            data = json.loads(self.rfile.read(length))
+            pdf_path = Path(data.get("ruta", ""))
+            if not pdf_path.is_file():
+                self._send_json(400, {"error": f"No existe el PDF: {pdf_path}"})
+                return None
+            return pdf_path
+
+        pdf_path = job_dir / "entrada.pdf"
+        remaining = length
+        with open(pdf_path, "wb") as f:
+            while remaining:
+                chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                f.write(chunk)
+                remaining -= len(chunk)
+        return pdf_path
+
+    def _send_zip(self, output_dir: Path, result: dict, timing: str):
+        """Envía los soportes y el manifiesto en un zip generado al vuelo"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", 'attachment; filename="soportes.zip"')
+        self.send_header("Server-Timing", timing)
+        self.end_headers()
+
+        names = {entry["archivo"] for entry in result["soportes"]}
+        names.update(result["informes"])
+        with zipfile.ZipFile(self.wfile, "w", zipfile.ZIP_STORED) as archive:
+            for name in sorted(names):
+                with open(output_dir / name, "rb") as source:
+                    with archive.open(name, "w") as target:
+                        shutil.copyfileobj(source, target, CHUNK_SIZE)
+            archive.writestr(
+                "manifiesto.json",
+                json.dumps(result["soportes"], ensure_ascii=False, indent=2),
+            )
+
+
+def main():
+    """Servicio HTTP local que mantiene el mapeo cargado entre peticiones"""
+    setup_default_logging()
+
+    parser = argparse.ArgumentParser(
+        description="Servicio HTTP para separar soportes sin arranque en frío",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Ejemplos de uso:
+  python pdf_server.py --initial-excel datos.xlsx --search-column "Ref" --rename-column "Nombre"
+  curl --data-binary @pagos.pdf -H "Content-Type: application/pdf" -o soportes.zip http://127.0.0.1:8765/procesar
+  curl -d '{"ruta": "/datos/pagos.pdf"}' -H "Content-Type: application/json" "http://127.0.0.1:8765/procesar?formato=manifiesto"
+    """,
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección de escucha")
+    parser.add_argument(
+        "--port", type=int, default=8765, help="Puerto (por defecto: 8765)"
+    )
+    parser.add_argument("--initial-excel", required=True, help="Excel con el mapeo")
+    parser.add_argument("--search-column", required=True, help="Columna de búsqueda")
+    parser.add_argument("--rename-column", required=True, help="Columna de renombrado")
+    parser.add_argument("--fuzzy-distance", type=int, default=0)
+    parser.add_argument(
+        "--workers", type=int, default=2, help="Procesos de trabajo (por defecto: 2)"
+    )
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=8,
+        help="Peticiones en espera antes de responder 503 (por defecto: 8)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=600,
+        help="Segundos máximos de espera por petición (por defecto: 600)",
+    )
+    parser.add_argument(
+        "--results-ttl",
+        type=float,
+        default=3600,
+        help=(
+            "Segundos que se conservan los resultados en modo manifiesto "
+            "antes de borrarlos (por defecto: 3600)"
+        ),
+    )
+    parser.add_argument(
+        "--max-upload-mb",
+        type=int,
+        default=200,
+        help="Tamaño máximo de los PDF subidos en MB (por defecto: 200)",
+    )
+    parser.add_argument(
+        "--work-dir",
+        default="./servidor_trabajos",
+        help="Carpeta de trabajo para subidas y resultados",
+    )
+    args = parser.parse_args()
+
+    from pdf_core import load_excel_mapping
+
+    mapping_columns = (args.search_column, args.rename_column)
+    try:
+        mapping = load_excel_mapping(args.initial_excel, *mapping_columns)
+    except Exception as e:
+        print(f"❌ Error: no se pudo cargar el mapeo desde el Excel: {e}")
+        sys.exit(1)
+
+    service = ProcessingService(
+        mapping,
+        mapping_columns,
+        args.fuzzy_distance,
+        args.work_dir,
+        max(args.workers, 1),
+        max(args.max_queue, 0),
+        args.timeout,
+        max(args.results_ttl, 1),
+    )
+    server = ThreadingHTTPServer((args.host, args.port), ProcessingHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.max_upload = args.max_upload_mb * 1024 * 1024
+
+    # SIGTERM sigue el mismo cierre que Ctrl+C: si no, los procesos del pool
+    # quedan huérfanos y mantienen abierto el puerto heredado
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"🌐 Escuchando en http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,63 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+class _DictAccess:
+    """Acceso por clave (registro["campo"], registro.get) para código existente"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+
+@dataclass(slots=True)
+class SupportFile(_DictAccess):
+    """Soporte escrito en disco durante la separación"""
+
+    file: str
+    page: int
+    support: int
+    rename_value: Optional[str]
+    confidence: float
+    duplicate_of: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ReportRow(_DictAccess):
+    """Fila del informe detallado, en el orden de las columnas exportadas"""
+
+    archivo: str
+    pagina_original: int
+    soporte_numero: int
+    valor_renombrado: Optional[str]
+    confianza: Optional[float]
+    numero_referencia: Optional[str]
+    monto: Optional[str]
+    fecha: Optional[str]
+    beneficiario: Optional[str]
+    cuenta: Optional[str]
+    banco: Optional[str]
+    duplicado_de: Optional[str] = None
+
+    def as_tuple(self) -> tuple:
+        return (
+            self.archivo,
+            self.pagina_original,
+            self.soporte_numero,
+            self.valor_renombrado,
+            self.confianza,
+            self.numero_referencia,
+            self.monto,
+            self.fecha,
+            self.beneficiario,
+            self.cuenta,
+            self.banco,
+            self.duplicado_de,
+        )
@@ -0,0 +1,306 @@
+import csv
+import importlib.util
+import json
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from records import ReportRow
+
+REPORT_FIELDS = [
+    "archivo",
+    "pagina_original",
+    "soporte_numero",
+    "valor_renombrado",
+    "confianza",
+    "numero_referencia",
+    "monto",
+    "fecha",
+    "beneficiario",
+    "cuenta",
+    "banco",
+    "duplicado_de",
+]
+
+REPORT_HEADERS = [
+    "Archivo",
+    "Página Original",
+    "Soporte #",
+    "Valor Renombrado",
+    "Confianza",
+    "Número Referencia",
+    "Monto",
+    "Fecha",
+    "Beneficiario",
+    "Cuenta",
+    "Banco",
+    "Duplicado De",
+]
+
+REPORT_BASENAME = "informe_detallado"
+
+# Filas acumuladas antes de volcar un lote en los formatos por lotes
+BATCH_SIZE = 1000
+
+
+def parse_amount(value) -> Optional[float]:
+    """Convierte montos como '1.234,56' o '1,234.56' a número"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = str(value).strip().replace(" ", "")
+    if not text:
+        return None
+
+    last_dot = text.rfind(".")
+    last_comma = text.rfind(",")
+    if last_dot != -1 and last_comma != -1:
+        decimal = "." if last_dot > last_comma else ","
+    else:
+        separator = "." if last_dot != -1 else ","
+        position = max(last_dot, last_comma)
+        if position == -1:
+            decimal = None
+        elif text.count(separator) > 1 or len(text) - position - 1 == 3:
+            decimal = None
+        else:
+            decimal = separator
+
+    thousands = {".", ","} - {decimal}
+    for separator in thousands:
+        text = text.replace(separator, "")
+    if decimal:
+        text = text.replace(decimal, ".")
+
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _typed_row(row: ReportRow) -> dict:
+    """Fila del informe con tipos explícitos para formatos analíticos"""
+    confidence = row.confianza
+    return {
+        "archivo": row.archivo,
+        "pagina_original": int(row.pagina_original),
+        "soporte_numero": int(row.soporte_numero),
+        "valor_renombrado": row.valor_renombrado,
+        "confianza": float(confidence) if confidence is not None else None,
+        "numero_referencia": row.numero_referencia,
+        "monto": parse_amount(row.monto),
+        "monto_texto": row.monto,
+        "fecha": row.fecha,
+        "beneficiario": row.beneficiario,
+        "cuenta": row.cuenta,
+        "banco": row.banco,
+        "duplicado_de": row.duplicado_de,
+    }
+
+
+class CsvReportWriter:
+    """Escribe el informe detallado en CSV fila a fila"""
+
+    extension = "csv"
+    label = "CSV"
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(REPORT_FIELDS)
+        self.rows = 0
+
+    def append(self, row: ReportRow):
+        self._writer.writerow(row.as_tuple())
+        self.rows += 1
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxReportWriter:
+    """Escribe el informe detallado en Excel en modo de solo escritura.
+
+    openpyxl vuelca cada fila a un archivo temporal a medida que se añade, así
+    que la memoria no crece con el número de soportes.
+    """
+
+    extension = "xlsx"
+    label = "Excel"
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec("openpyxl") is not None
+
+    def __init__(self, path: Path):
+        from openpyxl import Workbook
+
+        self.path = Path(path)
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Soportes Procesados")
+        self._ws.append(REPORT_HEADERS)
+        self.rows = 0
+
+    def _number_cell(self, value: Union[int, float, None], number_format: str):
+        from openpyxl.cell import WriteOnlyCell
+
+        cell = WriteOnlyCell(self._ws, value=value)
+        cell.number_format = number_format
+        return cell
+
+    def append(self, row: ReportRow):
+        amount = parse_amount(row.monto)
+        confidence = row.confianza
+        self._ws.append(
+            [
+                row.archivo,
+                row.pagina_original,
+                row.soporte_numero,
+                row.valor_renombrado,
+                self._number_cell(
+                    float(confidence) if confidence is not None else None, "0.00"
+                ),
+                row.numero_referencia,
+                self._number_cell(amount, "#,##0.00")
+                if amount is not None
+                else row.monto,
+                row.fecha,
+                row.beneficiario,
+                row.cuenta,
+                row.banco,
+                row.duplicado_de,
+            ]
+        )
+        self.rows += 1
+
+    def close(self):
+        self._wb.save(str(self.path))
+
+
+class JsonlReportWriter:
+    """Escribe el informe detallado como JSON Lines, una fila tipada por línea"""
+
+    extension = "jsonl"
+    label = "JSONL"
+
+    @staticmethod
+    def available() -> bool:
+        return True
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._pending = []
+        self.rows = 0
+
+    def append(self, row: ReportRow):
+        self._pending.append(json.dumps(_typed_row(row), ensure_ascii=False))
+        self.rows += 1
+        if len(self._pending) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._file.write("\n".join(self._pending) + "\n")
+            self._pending = []
+
+    def close(self):
+        self._flush()
+        self._file.close()
+
+
+def read_jsonl_report(path: Path) -> Iterator[ReportRow]:
+    """Lee un informe JSONL escrito por JsonlReportWriter"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            yield ReportRow(
+                data["archivo"],
+                data["pagina_original"],
+                data["soporte_numero"],
+                data["valor_renombrado"],
+                data["confianza"],
+                data["numero_referencia"],
+                data["monto_texto"],
+                data["fecha"],
+                data["beneficiario"],
+                data["cuenta"],
+                data["banco"],
+                data.get("duplicado_de"),
+            )
+
+
+class ParquetReportWriter:
+    """Escribe el informe detallado en Parquet por lotes (requiere pyarrow)"""
+
+    extension = "parquet"
+    label = "Parquet"
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec("pyarrow") is not None
+
+    def __init__(self, path: Path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.path = Path(path)
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("archivo", pa.string()),
+                ("pagina_original", pa.int32()),
+                ("soporte_numero", pa.int32()),
+                ("valor_renombrado", pa.string()),
+                ("confianza", pa.float64()),
+                ("numero_referencia", pa.string()),
+                ("monto", pa.float64()),
+                ("monto_texto", pa.string()),
+                ("fecha", pa.string()),
+                ("beneficiario", pa.string()),
+                ("cuenta", pa.string()),
+                ("banco", pa.string()),
+                ("duplicado_de", pa.string()),
+            ]
+        )
+        self._writer = pq.ParquetWriter(str(self.path), self._schema)
+        self._pending = []
+        self.rows = 0
+
+    def append(self, row: ReportRow):
+        self._pending.append(_typed_row(row))
+        self.rows += 1
+        if len(self._pending) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            batch = self._pa.RecordBatch.from_pylist(self._pending, schema=self._schema)
+            self._writer.write_batch(batch)
+            self._pending = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+REPORT_WRITERS = {
+    "csv": CsvReportWriter,
+    "xlsx": XlsxReportWriter,
+    "jsonl": JsonlReportWriter,
+    "parquet": ParquetReportWriter,
+}
+
+
+def open_report_writer(export_format: str, output_dir: Path):
+    """Crea el escritor de informe para el formato pedido"""
+    writer_cls = REPORT_WRITERS[export_format]
+    return writer_cls(Path(output_dir) / f"{REPORT_BASENAME}.{writer_cls.extension}")
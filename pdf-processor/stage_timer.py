@@ -0,0 +1,62 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageTimer:
+    """Acumula el tiempo invertido en cada etapa del procesamiento.
+
+    Las etapas pueden anidarse: a una etapa se le descuenta el tiempo de las
+    que se abren dentro de ella en el mismo hilo, así cada segundo cuenta en
+    una sola etapa y los porcentajes no se duplican.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self._totals: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    @contextmanager
+    def stage(self, stage: str):
+        nested = getattr(self._local, "nested", None)
+        if nested is None:
+            nested = self._local.nested = []
+        nested.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            inner = nested.pop()
+            if nested:
+                nested[-1] += elapsed
+            self.add(stage, elapsed - inner)
+
+    def summary(self) -> dict:
+        """Devuelve los tiempos agregados por etapa, ordenados de mayor a menor"""
+        elapsed = time.perf_counter() - self._started
+        with self._lock:
+            totals = dict(self._totals)
+            counts = dict(self._counts)
+        stages = {}
+        for stage in sorted(totals, key=totals.get, reverse=True):
+            total = totals[stage]
+            count = counts[stage]
+            stages[stage] = {
+                "llamadas": count,
+                "total_s": round(total, 4),
+                "promedio_ms": round(total * 1000 / count, 3) if count else 0.0,
+                "porcentaje": round(total * 100 / elapsed, 1) if elapsed else 0.0,
+            }
+        return {"total_ejecucion_s": round(elapsed, 4), "etapas": stages}
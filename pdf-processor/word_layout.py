@@ -0,0 +1,167 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Alto (en puntos) de cada franja horizontal del índice espacial
+ROW_BIN = 4.0
+
+# Distancia máxima, en alturas de línea, para buscar un valor debajo del rótulo
+MAX_LINES_BELOW = 3
+
+# Separación horizontal, en alturas de línea, que corta un valor de varias palabras
+MAX_WORD_GAP = 1.0
+
+_EDGE_PUNCTUATION = re.compile(r"^[\W_]+|[\W_]+$")
+
+
+class Word(NamedTuple):
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    text: str
+    key: str
+
+    @property
+    def height(self) -> float:
+        return self.y1 - self.y0
+
+    @property
+    def center_y(self) -> float:
+        return (self.y0 + self.y1) / 2
+
+
+def word_key(text: str) -> str:
+    """Palabra en minúsculas y sin puntuación en los extremos"""
+    return _EDGE_PUNCTUATION.sub("", text.casefold())
+
+
+class WordLayout:
+    """Índice espacial de las palabras de una página o de una región.
+
+    Recibe las tuplas de page.get_text("words") y las agrupa en franjas
+    horizontales ordenadas por x, de modo que localizar la palabra a la derecha
+    o debajo de un rótulo es una búsqueda binaria y no un recorrido del texto.
+    """
+
+    def __init__(self, words: Sequence[tuple], clip=None):
+        self.words: List[Word] = []
+        for entry in words:
+            x0, y0, x1, y1, text = entry[:5]
+            if clip is not None:
+                center_x = (x0 + x1) / 2
+                center_y = (y0 + y1) / 2
+                if not (
+                    clip.x0 <= center_x <= clip.x1 and clip.y0 <= center_y <= clip.y1
+                ):
+                    continue
+            self.words.append(Word(x0, y0, x1, y1, text, word_key(text)))
+
+        self._positions: Dict[str, List[int]] = {}
+        self._rows: Dict[int, List[Tuple[float, int]]] = {}
+        for index, word in enumerate(self.words):
+            self._positions.setdefault(word.key, []).append(index)
+            self._rows.setdefault(int(word.center_y // ROW_BIN), []).append(
+                (word.x0, index)
+            )
+        for row in self._rows.values():
+            row.sort()
+        self._row_keys = sorted(self._rows)
+
+    def find_label(self, label: str) -> List[int]:
+        """Índices de la última palabra de cada aparición del rótulo.
+
+        Las apariciones terminadas en ':' van primero, porque casi siempre son
+        el rótulo y no una palabra del valor.
+        """
+        tokens = [word_key(token) for token in label.split()]
+        tokens = [token for token in tokens if token]
+        if not tokens:
+            return []
+
+        found = []
+        for start in self._positions.get(tokens[0], ()):
+            end = start + len(tokens) - 1
+            if end >= len(self.words):
+                continue
+            if all(
+                self.words[start + offset].key == token
+                for offset, token in enumerate(tokens)
+            ):
+                found.append(end)
+
+        found.sort(key=lambda index: (not self.words[index].text.endswith(":"), index))
+        return found
+
+    def _row_words(self, row_key: int, x_from: float) -> List[Word]:
+        row = self._rows[row_key]
+        start = bisect_left(row, (x_from, -1))
+        return [self.words[index] for _, index in row[start:]]
+
+    def right_of(self, index: int) -> List[Word]:
+        """Palabras de la misma línea a la derecha de la indicada, en orden"""
+        label = self.words[index]
+        center = int(label.center_y // ROW_BIN)
+        line = []
+        for row_key in (center - 1, center, center + 1):
+            if row_key not in self._rows:
+                continue
+            for word in self._row_words(row_key, label.x1 - 1):
+                if word is label:
+                    continue
+                if abs(word.center_y - label.center_y) <= label.height / 2:
+                    line.append(word)
+        line.sort(key=lambda word: word.x0)
+        return line
+
+    def below(self, index: int) -> List[Word]:
+        """Primera línea bajo la palabra que la solapa en horizontal"""
+        label = self.words[index]
+        limit = label.y1 + label.height * MAX_LINES_BELOW
+        first_row = bisect_right(self._row_keys, int(label.center_y // ROW_BIN) + 1)
+
+        for row_key in self._row_keys[first_row:]:
+            if row_key * ROW_BIN > limit:
+                break
+            row = self._rows[row_key]
+            stop = bisect_right(row, (label.x1, len(self.words)))
+            for _, word_index in row[:stop]:
+                word = self.words[word_index]
+                if word.x1 >= label.x0 and word.y0 >= label.y1 - 1:
+                    return [word] + self.right_of(word_index)
+        return []
+
+    def value_after(
+        self, labels: Sequence[str], pattern: str, multiword: bool = False
+    ) -> Optional[str]:
+        """Valor situado a la derecha (o si no, debajo) del primer rótulo que aparezca"""
+        compiled = re.compile(pattern, re.IGNORECASE)
+        for label in labels:
+            for index in self.find_label(label):
+                for candidates in (self.right_of(index), self.below(index)):
+                    value = _read_value(candidates, compiled, multiword)
+                    if value:
+                        return value
+        return None
+
+
+def _read_value(words: List[Word], pattern, multiword: bool) -> Optional[str]:
+    parts = []
+    previous = None
+    for word in words:
+        text = word.text.lstrip(":-$ ").rstrip(":;,")
+        if not parts and not text:
+            continue
+        if parts:
+            gap = word.x0 - previous.x1
+            if word.text.endswith(":") or gap > previous.height * MAX_WORD_GAP:
+                break
+        parts.append(text)
+        previous = word
+        if not multiword:
+            break
+
+    if not parts:
+        return None
+    value = " ".join(parts)
+    return value if pattern.fullmatch(value) else None